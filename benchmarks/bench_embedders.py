@@ -0,0 +1,116 @@
+"""Compare O*NET embedder backends on latency and top-1 agreement.
+
+The hashing backend is compared against the Universal Sentence Encoder
+when tensorflow_hub is installed; otherwise only its timings are reported.
+
+Usage:
+    python -m benchmarks.bench_embedders --onet "Occupation Data.xlsx"
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from resume_parsing import (
+    embedders,
+    onet_data,
+    onet_index,
+    onet_retrieval,
+    onet_similarity,
+)
+
+JOBS = [
+    ("Cashier", "Operated register, handled cash and card payments, balanced drawer"),
+    ("Sales Associate", "Helped customers find merchandise, restocked shelves"),
+    ("CNA", "Assisted residents with bathing, feeding and mobility; took vitals"),
+    ("Registered Nurse", "Administered medication and monitored patient condition"),
+    ("Line Cook", "Prepared dishes on the grill and saute stations"),
+    ("Warehouse Associate", "Picked and packed orders, operated forklift"),
+    ("Truck Driver", "Drove tractor-trailer on regional routes, logged hours"),
+    ("Customer Service Representative", "Answered calls and resolved billing issues"),
+    ("Administrative Assistant", "Scheduled meetings, answered phones, filed records"),
+    ("Software Developer", "Built web applications in Python and JavaScript"),
+    ("Janitor", "Cleaned floors, restrooms and offices; emptied trash"),
+    ("Security Officer", "Patrolled premises and monitored surveillance cameras"),
+    ("Teacher Aide", "Supported classroom instruction and supervised students"),
+    ("Bookkeeper", "Maintained ledgers, reconciled accounts, processed payroll"),
+    ("Welder", "Welded steel components using MIG and TIG processes"),
+    ("Server", "Took orders and served food and beverages to guests"),
+    ("Electrician", "Installed and repaired wiring, fixtures and panels"),
+    ("Home Health Aide", "Provided personal care to clients in their homes"),
+    ("Machine Operator", "Set up and ran production machinery, inspected parts"),
+    ("Receptionist", "Greeted visitors, routed calls, managed front desk"),
+]
+
+
+def build(onet, name, out_dir):
+    t = time.perf_counter()
+    embed = embedders.get_embedder(name)
+    t_load = time.perf_counter() - t
+    t = time.perf_counter()
+    path = onet_index.build_index(onet, embed, out_dir)
+    t_build = time.perf_counter() - t
+    t = time.perf_counter()
+    index = onet_index.load_index(path)
+    embed = embedders.get_embedder(index.manifest["model"], index.path)
+    t_startup = time.perf_counter() - t
+    return index, embed, t_load, t_build, t_startup
+
+
+def top1(index, embed, jobs, repeat):
+    titles = [t for t, _ in jobs]
+    descriptions = [d for _, d in jobs]
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        embeddings = embed(titles + descriptions)
+        scores = onet_similarity.score_jobs(
+            embeddings[: len(jobs)], embeddings[len(jobs) :], index
+        )
+        idx, _ = onet_retrieval.top_k(scores, 1)
+        times.append(time.perf_counter() - t)
+    return index.soc[idx[:, 0]], min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--onet", help="Occupation Data.xlsx (default: STAGING_PATH)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.onet:
+        onet = onet_data.OnetTable.from_frame(pd.read_excel(args.onet))
+    else:
+        onet = onet_similarity.get_onet()
+    tmp = tempfile.mkdtemp()
+    try:
+        results = {}
+        for name in ("hashing", "use"):
+            try:
+                index, embed, t_load, t_build, t_startup = build(
+                    onet, name, f"{tmp}/{name}"
+                )
+            except ImportError as err:
+                print(f"{name}: skipped ({err})")
+                continue
+            soc, t_query = top1(index, embed, JOBS, args.repeat)
+            results[name] = soc
+            print(
+                f"{name:<8} model load {t_load:7.2f}s  index build {t_build:7.2f}s  "
+                f"startup {t_startup:6.3f}s  {len(JOBS)} jobs {t_query * 1e3:7.1f}ms"
+            )
+        if len(results) == 2:
+            agreement = np.mean(results["hashing"] == results["use"])
+            print(f"top-1 agreement with USE: {agreement:.0%}")
+        for (title, _), *socs in zip(JOBS, *results.values()):
+            print(f"  {title:<32} " + "  ".join(str(s) for s in socs))
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Compare OCR backends on throughput and agreement with Vision's output.
+
+The corpus is a directory of scanned PDFs, each with the page texts Vision
+returned for it recorded next to it as [name].vision.json. Record them once
+with real Vision credentials:
+
+    python -m benchmarks.bench_ocr --corpus resumes/ --record
+
+Without --corpus, synthetic scanned resumes from benchmarks.documents are
+used, with the text they were rendered from standing in for Vision's.
+
+Each backend is given as name[:dpi], and similarity is the ratio of
+matching words between a backend's text and the reference, from 0 to 1.
+
+Usage:
+    python -m benchmarks.bench_ocr --backend tesseract:150 tesseract:300
+"""
+
+import argparse
+import difflib
+import json
+import pathlib
+import time
+
+import fitz
+
+from benchmarks.documents import make_scanned_pdf, scanned_pages
+from benchmarks.synthetic import make_resume
+from resume_parsing import ocr, pdf_pages
+
+
+def load_corpus(corpus: pathlib.Path):
+    """(name, content, reference page texts) for each recorded PDF."""
+    for path in sorted(corpus.glob("*.pdf")):
+        recorded = path.with_suffix(".vision.json")
+        if not recorded.exists():
+            print(f"Skipping {path.name}: no recorded Vision output")
+            continue
+        yield path.name, path.read_bytes(), json.loads(recorded.read_text())
+
+
+def synthetic_corpus(docs: int):
+    for seed in range(docs):
+        text, _ = make_resume(n_jobs=6, n_schools=2, seed=seed)
+        content = make_scanned_pdf(text, zoom=300 / 72)
+        yield f"synthetic-{seed}", content, scanned_pages(content)
+
+
+def page_count(content: bytes) -> int:
+    pdf = fitz.open(stream=content, filetype="pdf")
+    try:
+        return pdf.page_count
+    finally:
+        pdf.close()
+
+
+def record(corpus: pathlib.Path):
+    backend = ocr.VisionOcrBackend()
+    for path in sorted(corpus.glob("*.pdf")):
+        content = path.read_bytes()
+        pages = list(backend.iter_pages(content, page_count(content)))
+        path.with_suffix(".vision.json").write_text(json.dumps(pages))
+        print(f"Recorded {len(pages)} pages of {path.name}")
+
+
+def make_backend(spec: str) -> ocr.OcrBackend:
+    name, _, dpi = spec.partition(":")
+    backend = ocr.OCR_BACKENDS[name]
+    return backend(int(dpi)) if dpi else backend()
+
+
+def similarity(text: str, reference: str) -> float:
+    return difflib.SequenceMatcher(
+        None, text.split(), reference.split(), autojunk=False
+    ).ratio()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--backend", nargs="+", default=["tesseract"])
+    parser.add_argument("--corpus", type=pathlib.Path)
+    parser.add_argument("--record", action="store_true")
+    parser.add_argument("--docs", type=int, default=5, help="Synthetic documents")
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.corpus)
+        return
+
+    if args.corpus:
+        corpus = list(load_corpus(args.corpus))
+    else:
+        corpus = list(synthetic_corpus(args.docs))
+    pages = sum(len(reference) for _, _, reference in corpus)
+    print(f"{len(corpus)} documents, {pages} pages")
+    print(f"{'backend':>16} {'pages/s':>8} {'similarity':>11} {'worst':>6}")
+    try:
+        for spec in args.backend:
+            backend = make_backend(spec)
+            list(backend.iter_pages(corpus[0][1], 1))  # Start the pool
+            scores = []
+            start = time.perf_counter()
+            for _, content, reference in corpus:
+                text = list(backend.iter_pages(content, len(reference)))
+                scores.append(similarity(" ".join(text), " ".join(reference)))
+            elapsed = time.perf_counter() - start
+            print(
+                f"{spec:>16} {pages / elapsed:>8.2f} "
+                f"{sum(scores) / len(scores):>11.3f} {min(scores):>6.3f}"
+            )
+    finally:
+        pdf_pages.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Benchmark O*NET top-k retrieval: full argsort, argpartition and IVF.
+
+Uses a synthetic, clustered taxonomy the size of the O*NET alternate
+titles list. Recall of the IVF index is measured against exact search.
+
+Usage:
+    python -m benchmarks.bench_onet_retrieval --rows 50000 --queries 1000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from resume_parsing import onet_retrieval
+from resume_parsing.onet_index import normalize_rows
+
+
+def make_vectors(rows, queries, dims, clusters, seed=0):
+    """Clustered unit vectors, roughly mimicking sentence embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dims)).astype(np.float32)
+    taxonomy = centers[rng.integers(clusters, size=rows)]
+    taxonomy += 1.5 * rng.standard_normal((rows, dims)).astype(np.float32)
+    jobs = taxonomy[rng.integers(rows, size=queries)]
+    jobs += 1.5 * rng.standard_normal((queries, dims)).astype(np.float32)
+    return normalize_rows(taxonomy), normalize_rows(jobs)
+
+
+def timed(fn):
+    t = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--dims", type=int, default=512)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--n-probe", type=int, nargs="+", default=[4, 8, 16, 32])
+    args = parser.parse_args()
+
+    taxonomy, jobs = make_vectors(args.rows, args.queries, args.dims, args.clusters)
+    labels = np.array([f"{i:08d}" for i in range(args.rows)])
+    scores = jobs @ taxonomy.T
+
+    argsort_idx, t_argsort = timed(lambda: (-scores).argsort()[:, : args.k])
+    (topk_idx, _), t_topk = timed(lambda: onet_retrieval.top_k(scores, args.k))
+    assert (np.sort(argsort_idx, axis=1) == np.sort(topk_idx, axis=1)).all()
+    print(f"{'full argsort':<24} {t_argsort * 1e3:>9.1f} ms")
+    print(f"{'argpartition top-k':<24} {t_topk * 1e3:>9.1f} ms")
+
+    exact = onet_retrieval.ExactIndex(taxonomy, labels)
+    (exact_labels, _), t_exact = timed(lambda: exact.search(jobs, args.k))
+    print(f"{'exact search':<24} {t_exact * 1e3:>9.1f} ms (incl. matrix product)")
+
+    ivf, t_build = timed(lambda: onet_retrieval.IVFIndex(taxonomy, labels))
+    print(f"{'IVF build':<24} {t_build * 1e3:>9.1f} ms ({len(ivf.centroids)} lists)")
+    for n_probe in args.n_probe:
+        ivf.n_probe = n_probe
+        (ivf_labels, _), t_ivf = timed(lambda: ivf.search(jobs, args.k))
+        recall = onet_retrieval.recall_at_k(ivf_labels, exact_labels)
+        print(
+            f"{f'IVF n_probe={n_probe}':<24} {t_ivf * 1e3:>9.1f} ms "
+            f"recall@{args.k}={recall:.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Micro-benchmarks for the rule-based parser, with a saved baseline.
+
+Each case is timed on synthetic resumes from benchmarks.synthetic and
+compared to benchmarks/baseline_parser.json. The run fails when a case is
+slower than the baseline by more than the threshold. The baseline is
+recorded on the interpreter of the service image (Python 3.7), and runs on
+another minor version refuse to compare with it, as interpreter speed-ups
+would pass for parser changes.
+
+Cases are timed in interleaved rounds, so a burst of load on the machine
+does not land on a single case, and the best round is kept. Timings are
+only comparable on the same machine; re-record the baseline there with
+--save.
+
+Usage:
+    python -m benchmarks.bench_parser
+    python -m benchmarks.bench_parser --save
+    python -m benchmarks.bench_parser --only parse --threshold 1.1
+"""
+
+import argparse
+import json
+import pathlib
+import platform
+import sys
+import timeit
+
+from benchmarks.synthetic import DEGREES, make_resume
+from resume_parsing import custom_parser, utils
+
+BASELINE_PATH = pathlib.Path(__file__).with_name("baseline_parser.json")
+
+
+def make_cases() -> dict:
+    """Benchmark name -> zero-argument callable."""
+    cases = {}
+    for size, n_jobs in [("small", 2), ("medium", 6), ("large", 20)]:
+        text, ner = make_resume(n_jobs=n_jobs, n_schools=2, seed=n_jobs)
+        cases[f"parse.{size}"] = lambda ner=ner, text=text: custom_parser.parse(
+            ner, text
+        )
+
+    text, ner = make_resume(n_jobs=20, n_schools=3, seed=1)
+    positions = custom_parser.extract_entity_text(
+        ner, text, "POSN_NAM", return_indices=True
+    )
+    raw_dates = [
+        custom_parser.DATE_PATTERN.findall(" ".join(text[s : e + 60].split()))
+        for s, e in positions
+    ]
+    cases["extract_entity_text"] = lambda: custom_parser.extract_entity_text(
+        ner, text, "POSN_NAM", return_indices=True
+    )
+    cases["get_dates"] = lambda: custom_parser.get_dates(ner, text, positions)
+    cases["process_dates"] = lambda: custom_parser.process_dates(raw_dates)
+    cases["standardize_degree"] = lambda: [
+        custom_parser.standardize_degree(d) for d in DEGREES + ["Some College"]
+    ]
+
+    for n in (10, 50):
+        a = list(range(0, 10 * n, 10))
+        b = list(range(3, 7 * n, 7))
+        cases[f"align.{n}"] = lambda a=a, b=b: list(utils.align(a, b))
+
+    results = custom_parser.parse(ner, text)
+    for job in results["ResumeData"]["RSUM_WORK_HIST"]:
+        job["ONET_CD"] = "41-2031.00"
+    cases["to_xml"] = lambda: utils.to_xml(results)
+    return cases
+
+
+def measure(cases: dict, repeat: int) -> dict:
+    """Best seconds per call of each case, over interleaved rounds."""
+    timers = {}
+    for name, fn in cases.items():
+        timer = timeit.Timer(fn)
+        number, _ = timer.autorange()
+        timers[name] = (timer, number)
+    best = {name: float("inf") for name in cases}
+    for _ in range(repeat):
+        for name, (timer, number) in timers.items():
+            best[name] = min(best[name], timer.timeit(number) / number)
+    return best
+
+
+def _minor(version: str) -> str:
+    return ".".join(version.split(".")[:2])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--baseline", type=pathlib.Path, default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="Record a new baseline")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="Fail when a case takes longer than this times its baseline",
+    )
+    parser.add_argument("--only", help="Run cases whose name contains this")
+    parser.add_argument("--repeat", type=int, default=9)
+    args = parser.parse_args()
+
+    cases = {
+        name: fn
+        for name, fn in make_cases().items()
+        if not args.only or args.only in name
+    }
+    baseline = {}
+    if args.baseline.exists() and not args.save:
+        baseline = json.loads(args.baseline.read_text())
+        recorded = baseline.get("python", "")
+        if _minor(recorded) != _minor(platform.python_version()):
+            sys.exit(
+                f"The baseline was recorded on Python {recorded or 'unknown'}, "
+                f"not {platform.python_version()}. Run on that version, or "
+                "re-record the baseline with --save."
+            )
+
+    timings = measure(cases, args.repeat)
+
+    regressions = []
+    print(f"{'case':<22} {'us/call':>10} {'baseline':>10} {'ratio':>7}")
+    for name, seconds in timings.items():
+        line = f"{name:<22} {seconds * 1e6:>10.1f}"
+        if name in baseline.get("cases", {}):
+            ratio = seconds / baseline["cases"][name]
+            line += f" {baseline['cases'][name] * 1e6:>10.1f} {ratio:>6.2f}x"
+            if ratio > args.threshold:
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line)
+
+    if args.save:
+        args.baseline.write_text(
+            json.dumps(
+                {
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "cases": timings,
+                },
+                indent=2,
+            )
+            + "\n"
+        )
+        print(f"Saved baseline to {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.2f}x")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
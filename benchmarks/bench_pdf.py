@@ -0,0 +1,74 @@
+"""Benchmark serial against parallel text-layer extraction of long PDFs.
+
+Usage:
+    python -m benchmarks.bench_pdf --pages 100 --workers 1 2 4
+"""
+
+import argparse
+import os
+import time
+
+from benchmarks.documents import LINES_PER_PAGE, make_pdf
+from benchmarks.synthetic import make_resume
+from resume_parsing import doc_extractor, pdf_pages
+
+
+def make_portfolio(pages: int) -> bytes:
+    """A text-layer PDF of about the given number of full pages."""
+    lines = []
+    seed = 0
+    while len(lines) < pages * LINES_PER_PAGE:
+        text, _ = make_resume(n_jobs=8, n_schools=2, seed=seed)
+        lines.extend(text.splitlines())
+        seed += 1
+    return make_pdf("\n".join(lines[: pages * LINES_PER_PAGE]))
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, nargs="+", default=[100])
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=sorted({1, 2, os.cpu_count()})
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    doc_extractor.PDF_MAX_PAGES = 0
+    doc_extractor.PDF_MAX_TEXT = 0
+    print(f"{os.cpu_count()} cores")
+    print(f"{'pages':>6} {'workers':>8} {'ms':>10} {'speedup':>8}")
+    for pages in args.pages:
+        content = make_portfolio(pages)
+        pdf_pages.PDF_PARALLEL_PAGES = 0
+        expected = doc_extractor.process_pdf(content, ".pdf")
+        serial = best_of(
+            lambda: doc_extractor.process_pdf(content, ".pdf"), args.repeat
+        )
+        print(f"{pages:>6} {'serial':>8} {serial * 1e3:>10.1f} {1:>7.2f}x")
+
+        pdf_pages.PDF_PARALLEL_PAGES = 1
+        for workers in args.workers:
+            pdf_pages.PDF_PARALLEL_WORKERS = workers
+            pdf_pages.shutdown()  # The next call starts a pool of the new size
+            # Start the pool outside of the timings
+            assert doc_extractor.process_pdf(content, ".pdf") == expected
+            parallel = best_of(
+                lambda: doc_extractor.process_pdf(content, ".pdf"), args.repeat
+            )
+            print(
+                f"{pages:>6} {workers:>8} {parallel * 1e3:>10.1f} "
+                f"{serial / parallel:>7.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Benchmark utils.to_xml against the original string-concatenation version.
+
+Usage:
+    python -m benchmarks.bench_to_xml --jobs 50 100 400
+"""
+
+import argparse
+import io
+import timeit
+from xml.sax.saxutils import escape
+
+from resume_parsing import utils
+
+
+def legacy_to_xml(results) -> str:
+    """The original recursive string-concatenation serializer."""
+    _internal = ""
+    if isinstance(results, dict):
+        for key, value in results.items():
+            if key == "ResumeData":
+                _internal += '<?xml version="1.0" standalone="yes"?>\n'
+                _internal += f'<{key}  xmlns="http://tempuri.org/ResumeData.xsd">'
+                _internal += legacy_to_xml(value)
+                _internal += f"</{key}>"
+            elif isinstance(value, list):
+                for elem in value:
+                    _internal += f"<{key}>"
+                    _internal += legacy_to_xml(elem)
+                    _internal += f"</{key}>"
+            else:
+                if isinstance(value, dict):
+                    if len(value.items()) == 0:
+                        continue
+
+                _internal += f"<{key}>"
+                _internal += legacy_to_xml(value)
+                _internal += f"</{key}>"
+    else:
+        _internal += escape(str(results))
+    return _internal
+
+
+def make_results(n_jobs: int, resp_len: int = 1500) -> dict:
+    """A ResumeData dictionary with n_jobs work history entries."""
+    duty = "Managed daily store operations & trained <new> associates. "
+    return {
+        "ResumeData": {
+            "CUST_RSUM": {
+                "FST_NAM": "Jane",
+                "LAST_NAM": "Doe",
+                "EMAIL_ADR": "jane.doe@example.com",
+                "ZIP_CD": "53703",
+                "EDUC_LVL_CD": "05",
+            },
+            "RSUM_EDUC_HIST": [
+                {"INST_NAM": "University of Wisconsin", "EDUC_DET_TXT": "B.S."}
+            ],
+            "RSUM_WORK_HIST": [
+                {
+                    "ER_NAM": f"Employer {i}",
+                    "POSN_NAM": "Sales Associate",
+                    "STRT_MO": "1",
+                    "STRT_YR": "2010",
+                    "END_MO": "12",
+                    "END_YR": "2012",
+                    "RESP_TXT": (duty * (resp_len // len(duty) + 1))[:resp_len],
+                    "ONET_CD": "41-2031.00",
+                }
+                for i in range(n_jobs)
+            ],
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, nargs="+", default=[50, 100, 400])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    print(
+        f"{'jobs':>6} {'bytes':>10} {'legacy ms':>10} {'stream ms':>10} {'speedup':>8}"
+    )
+    for n_jobs in args.jobs:
+        results = make_results(n_jobs)
+        expected = legacy_to_xml(results)
+        assert utils.to_xml(results) == expected
+        buf = io.StringIO()
+        utils.write_xml(results, buf)
+        assert buf.getvalue() == expected
+        assert b"".join(utils.stream_xml(results)) == expected.encode("utf-8")
+
+        legacy = min(
+            timeit.repeat(
+                lambda: legacy_to_xml(results), repeat=args.repeat, number=args.number
+            )
+        )
+        stream = min(
+            timeit.repeat(
+                lambda: utils.to_xml(results), repeat=args.repeat, number=args.number
+            )
+        )
+        print(
+            f"{n_jobs:>6} {len(expected):>10} {legacy / args.number * 1e3:>10.3f} "
+            f"{stream / args.number * 1e3:>10.3f} {legacy / stream:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Resume documents in each supported format, built from synthetic text.
+
+Scanned PDFs are pages of rendered images with no text layer. The text of
+each page is kept in the document metadata, so the fake Vision client in
+benchmarks.fakes can "recognize" it without doing any OCR.
+"""
+
+import io
+import json
+import zipfile
+from xml.sax.saxutils import escape
+
+import fitz
+
+SCANNED_TEXT_KEY = "keywords"
+LINES_PER_PAGE = 45
+
+
+def _pages(text: str, lines_per_page: int = LINES_PER_PAGE):
+    lines = text.splitlines()
+    return [
+        "\n".join(lines[i : i + lines_per_page])
+        for i in range(0, max(len(lines), 1), lines_per_page)
+    ]
+
+
+def _text_pdf(pages) -> fitz.Document:
+    pdf = fitz.open()
+    for page_text in pages:
+        page = pdf.new_page()
+        page.insert_text((50, 60), page_text, fontsize=10)
+    return pdf
+
+
+def make_pdf(text: str) -> bytes:
+    """A PDF with a text layer."""
+    return _text_pdf(_pages(text)).tobytes()
+
+
+def make_scanned_pdf(text: str, zoom: float = 1.5) -> bytes:
+    """A PDF of page images only, as produced by a scanner."""
+    pages = _pages(text)
+    source = _text_pdf(pages)
+    pdf = fitz.open()
+    for page in source:
+        pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+        scanned = pdf.new_page(width=page.rect.width, height=page.rect.height)
+        scanned.insert_image(scanned.rect, pixmap=pixmap)
+    pdf.set_metadata({SCANNED_TEXT_KEY: json.dumps(pages)})
+    return pdf.tobytes()
+
+
+def scanned_pages(content: bytes):
+    """The page texts stored in a PDF built by make_scanned_pdf."""
+    with fitz.open(stream=content, filetype="pdf") as pdf:
+        return json.loads(pdf.metadata.get(SCANNED_TEXT_KEY) or "[]")
+
+
+def make_docx(text: str) -> bytes:
+    """A minimal Office Open XML document, one paragraph per line."""
+    paragraphs = "".join(
+        f'<w:p><w:r><w:t xml:space="preserve">{escape(line)}</w:t></w:r></w:p>'
+        for line in text.splitlines()
+    )
+    files = {
+        "[Content_Types].xml": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/'
+            'content-types">'
+            '<Default Extension="rels" ContentType="application/'
+            'vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/word/document.xml" ContentType="application/'
+            'vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+            "</Types>"
+        ),
+        "_rels/.rels": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/'
+            'relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/'
+            'officeDocument/2006/relationships/officeDocument" '
+            'Target="word/document.xml"/>'
+            "</Relationships>"
+        ),
+        "word/document.xml": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/'
+            'wordprocessingml/2006/main">'
+            f"<w:body>{paragraphs}</w:body></w:document>"
+        ),
+    }
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as docx:
+        for name, content in files.items():
+            docx.writestr(name, content)
+    return buffer.getvalue()
+
+
+def make_doc(text: str) -> bytes:
+    """An RTF document, as many legacy .doc resumes really are.
+
+    antiword rejects these, and doc_extractor falls back to unrtf.
+    """
+    body = "".join(
+        "".join(map(_rtf_char, line)) + "\\par\n" for line in text.splitlines()
+    )
+    return ("{\\rtf1\\ansi\\deff0{\\fonttbl{\\f0 Arial;}}\n" + body + "}").encode(
+        "ascii"
+    )
+
+
+def _rtf_char(c: str) -> str:
+    if c in "\\{}":
+        return "\\" + c
+    if ord(c) > 127:
+        # \\u takes a signed 16-bit UTF-16 unit, so astral characters take two
+        units = c.encode("utf-16-le")
+        return "".join(
+            f"\\u{int.from_bytes(units[i:i + 2], 'little', signed=True)}?"
+            for i in range(0, len(units), 2)
+        )
+    return c
+
+
+BUILDERS = {
+    "pdf": (".pdf", make_pdf),
+    "scanned": (".pdf", make_scanned_pdf),
+    "docx": (".docx", make_docx),
+    "doc": (".doc", make_doc),
+}
@@ -0,0 +1,135 @@
+"""Local stand-ins for the Cloud Vision and Vertex AI clients.
+
+Each call sleeps for a random, roughly log-normal latency around a mean and
+fails at a given rate, so the app can be load-tested without calling paid
+APIs. Recognition is faked: the Vision client reads the page texts stored
+by benchmarks.documents.make_scanned_pdf, and the Vertex endpoint tags the
+names, employers, titles and schools used by benchmarks.synthetic.
+"""
+
+import random
+import re
+import time
+from types import SimpleNamespace
+
+from google.api_core.exceptions import DeadlineExceeded
+from google.cloud import vision
+
+from benchmarks import synthetic
+from benchmarks.documents import scanned_pages
+from resume_parsing import clients
+
+
+class FakeServiceError(RuntimeError):
+    pass
+
+
+class _Latency:
+    def __init__(self, mean: float, error_rate: float, sigma: float = 0.5):
+        self.mean = mean
+        self.error_rate = error_rate
+        self.sigma = sigma
+        self.rng = random.Random()
+
+    def wait(self, name: str, timeout: float = None):
+        if self.mean > 0:
+            # Log-normal with the given mean: exp(mu + sigma^2 / 2) = mean
+            mu = -(self.sigma**2) / 2
+            latency = self.mean * self.rng.lognormvariate(mu, self.sigma)
+            if timeout is not None and latency > timeout:
+                time.sleep(max(timeout, 0))
+                raise DeadlineExceeded(f"{name} call timed out")
+            time.sleep(latency)
+        if self.rng.random() < self.error_rate:
+            raise FakeServiceError(f"Injected {name} failure")
+
+
+class FakeVisionClient:
+    """ImageAnnotatorClient.batch_annotate_files for PDF input."""
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0):
+        self.latency = _Latency(latency, error_rate)
+
+    def batch_annotate_files(self, requests, timeout=None, metadata=()):
+        self.latency.wait("Vision", timeout)
+        responses = []
+        for request in requests:
+            pages = scanned_pages(request["input_config"]["content"])
+            responses.append(
+                vision.AnnotateFileResponse(
+                    responses=[
+                        vision.AnnotateImageResponse(
+                            full_text_annotation=vision.TextAnnotation(
+                                text=pages[page - 1] if page <= len(pages) else ""
+                            ),
+                            context=vision.ImageAnnotationContext(page_number=page),
+                        )
+                        for page in request["pages"]
+                    ],
+                    total_pages=len(pages),
+                )
+            )
+        return vision.BatchAnnotateFilesResponse(responses=responses)
+
+
+def _alternation(words):
+    return "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+
+ENTITY_PATTERNS = [
+    ("ER_NAM", re.compile(rf"\b(?:{_alternation(synthetic.EMPLOYERS)})")),
+    ("POSN_NAM", re.compile(rf"\b(?:{_alternation(synthetic.POSITIONS)})\b")),
+    ("INST_NAM", re.compile(rf"\b(?:{_alternation(synthetic.SCHOOLS)})\b")),
+    ("EDUC_DET_TXT", re.compile(rf"\b(?:{_alternation(synthetic.DEGREES)})")),
+    ("EMAIL_ADR", re.compile(r"[\w.]+@[\w.]+\.\w+")),
+    ("PHONE_NUMBER", re.compile(r"\(\d{3}\) \d{3}-\d{4}")),
+]
+NAME_PATTERN = re.compile(
+    rf"\b({_alternation(synthetic.FIRST_NAMES)})\s+"
+    rf"({_alternation(synthetic.LAST_NAMES)})\b"
+)
+
+
+def fake_ner(text: str) -> dict:
+    """NER inference in the shape returned by the endpoint."""
+    spans = []
+    name = NAME_PATTERN.search(text)
+    if name:
+        spans.append(("FST_NAM", name.start(1), name.end(1)))
+        spans.append(("LAST_NAM", name.start(2), name.end(2)))
+    for entity, pattern in ENTITY_PATTERNS:
+        spans.extend((entity, m.start(), m.end()) for m in pattern.finditer(text))
+    return {
+        "displayNames": [entity for entity, _, _ in spans],
+        "textSegmentStartOffsets": [str(start) for _, start, _ in spans],
+        "textSegmentEndOffsets": [str(end) for _, _, end in spans],
+    }
+
+
+class FakeEndpoint:
+    """aiplatform.Endpoint.predict for the NER model."""
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0):
+        self.latency = _Latency(latency, error_rate)
+
+    def predict(self, instances, parameters=None, timeout=None):
+        self.latency.wait("Vertex AI", timeout)
+        return SimpleNamespace(
+            predictions=[fake_ner(instance["content"]) for instance in instances]
+        )
+
+
+def install(
+    vision_latency: float = 0.0,
+    vision_error_rate: float = 0.0,
+    vertex_latency: float = 0.0,
+    vertex_error_rate: float = 0.0,
+):
+    """Make every client created by resume_parsing.clients a fake."""
+    clients.set_factory(
+        "vision", lambda: FakeVisionClient(vision_latency, vision_error_rate)
+    )
+    clients.set_factory(
+        "endpoint",
+        lambda *args, **kwargs: FakeEndpoint(vertex_latency, vertex_error_rate),
+    )
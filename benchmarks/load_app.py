@@ -0,0 +1,31 @@
+"""The app wired to the fakes in benchmarks.fakes, for load tests.
+
+Run it like the real app, from the resume_parsing directory with the
+repository root on PYTHONPATH:
+
+    gunicorn benchmarks.load_app:app -c ../gunicorn_conf.py \\
+        -k uvicorn.workers.UvicornWorker
+
+Latency (mean seconds per call) and error rates of the fakes are read from
+LOADTEST_VISION_LATENCY, LOADTEST_VISION_ERROR_RATE, LOADTEST_VERTEX_LATENCY
+and LOADTEST_VERTEX_ERROR_RATE.
+"""
+
+import os
+
+from benchmarks import fakes
+from resume_parsing import main, ner_trigger, pipeline
+
+fakes.install(
+    vision_latency=float(os.getenv("LOADTEST_VISION_LATENCY", "0.5")),
+    vision_error_rate=float(os.getenv("LOADTEST_VISION_ERROR_RATE", "0")),
+    vertex_latency=float(os.getenv("LOADTEST_VERTEX_LATENCY", "0.3")),
+    vertex_error_rate=float(os.getenv("LOADTEST_VERTEX_ERROR_RATE", "0")),
+)
+
+# Send NER through the (fake) endpoint client rather than the fixtures, and
+# skip the endpoint lookup by display name
+pipeline.ner_trigger = ner_trigger
+main.app.state.endpoint_id = "loadtest"
+
+app = main.app
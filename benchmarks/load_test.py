@@ -0,0 +1,386 @@
+"""End-to-end load test of /api/resumes/ against local fakes of Google APIs.
+
+Starts gunicorn with benchmarks.load_app, drives it with a mixed corpus of
+text PDFs, scanned PDFs, DOC and DOCX files, and reports throughput,
+latency percentiles, time per pipeline stage (from /api/resumes/metrics)
+and worker memory. Use --json to keep results for comparing
+configurations, and --env to pass any setting to the server.
+
+Usage:
+    python -m benchmarks.load_test --workers 4 --concurrency 8 --requests 400
+    python -m benchmarks.load_test --rps 5 --duration 60 --env PRELOAD_APP=false
+    python -m benchmarks.load_test --url http://localhost:8000 --concurrency 4
+"""
+
+import argparse
+import base64
+import collections
+import json
+import os
+import pathlib
+import random
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.documents import BUILDERS
+from benchmarks.synthetic import make_resume
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+API = "/api/resumes/"
+METRICS = "/api/resumes/metrics"
+HEALTHCHECK = "/api/resumes/healthcheck"
+STAGE_SAMPLE = re.compile(
+    r'^resume_parsing_stage_seconds_(sum|count)\{stage="([^"]+)"\} (\S+)$', re.M
+)
+
+
+def make_corpus(n: int, mix: dict, seed: int = 0):
+    """n request bodies as (kind, JSON payload), drawn according to mix."""
+    rng = random.Random(seed)
+    kinds = rng.choices(list(mix), weights=list(mix.values()), k=n)
+    corpus = []
+    for i, kind in enumerate(kinds):
+        text, _ = make_resume(n_jobs=rng.randint(1, 8), seed=seed * 100_003 + i)
+        extension, build = BUILDERS[kind]
+        payload = {
+            "file": base64.b64encode(build(text)).decode("ascii"),
+            "fileExtension": extension,
+        }
+        corpus.append((kind, json.dumps(payload).encode("utf-8")))
+    return corpus
+
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for part in value.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in BUILDERS:
+            raise argparse.ArgumentTypeError(f"Unknown document kind [{kind}]")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def post(url: str, body: bytes, timeout: float):
+    request = urllib.request.Request(
+        url + API,
+        data=body,
+        headers={
+            "Content-Type": "application/json",
+            "X-Request-Timeout": str(timeout),
+        },
+    )
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as err:
+        status = err.code
+    except (urllib.error.URLError, OSError) as err:
+        status = type(err).__name__
+    return status, time.perf_counter() - start
+
+
+def stage_totals(url: str) -> dict:
+    """stage -> [total seconds, count] from the Prometheus endpoint."""
+    try:
+        with urllib.request.urlopen(url + METRICS, timeout=10) as response:
+            text = response.read().decode("utf-8")
+    except (urllib.error.URLError, OSError):
+        return {}
+    totals = collections.defaultdict(lambda: [0.0, 0.0])
+    for kind, stage, value in STAGE_SAMPLE.findall(text):
+        totals[stage][0 if kind == "sum" else 1] += float(value)
+    return dict(totals)
+
+
+def memory_mb(pid: int) -> dict:
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    except OSError:
+        return {}
+    return {"rss": fields.get("Rss", 0), "pss": fields.get("Pss", 0)}
+
+
+def worker_pids(pid: int):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+class MemorySampler(threading.Thread):
+    """Peak RSS and PSS of the gunicorn master and its workers."""
+
+    def __init__(self, pid: int, interval: float = 1.0):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak = {}
+        self._done = threading.Event()
+
+    def sample(self):
+        for pid in [self.pid] + worker_pids(self.pid):
+            usage = memory_mb(pid)
+            peak = self.peak.setdefault(pid, {"rss": 0.0, "pss": 0.0})
+            for key, value in usage.items():
+                peak[key] = max(peak[key], value)
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        self.sample()
+
+
+def start_server(args) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(
+            filter(None, [str(ROOT), os.environ.get("PYTHONPATH")])
+        ),
+        "PORT": str(args.port),
+        "WEB_CONCURRENCY": str(args.workers),
+        "PRELOAD_APP": "true",
+        "ACCESS_LOG": "",
+        "PROMETHEUS_MULTIPROC_DIR": tempfile.mkdtemp(prefix="loadtest-metrics-"),
+        "LOADTEST_VISION_LATENCY": str(args.vision_latency),
+        "LOADTEST_VISION_ERROR_RATE": str(args.vision_error_rate),
+        "LOADTEST_VERTEX_LATENCY": str(args.vertex_latency),
+        "LOADTEST_VERTEX_ERROR_RATE": str(args.vertex_error_rate),
+    }
+    for setting in args.env:
+        key, _, value = setting.partition("=")
+        env[key] = value
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "benchmarks.load_app:app",
+            "-c",
+            str(ROOT / "gunicorn_conf.py"),
+            "-k",
+            "uvicorn.workers.UvicornWorker",
+        ],
+        cwd=ROOT / "resume_parsing",
+        env=env,
+    )
+    url = f"http://127.0.0.1:{args.port}"
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("The server exited during startup")
+        try:
+            urllib.request.urlopen(url + HEALTHCHECK, timeout=1).close()
+            return server
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError("The server did not become healthy within 120s")
+
+
+def drive(url: str, corpus, args):
+    """Send the corpus in a closed loop (concurrency) or open loop (rps)."""
+    results = []
+    lock = threading.Lock()
+    end = time.monotonic() + args.duration if args.duration else None
+
+    def send(kind, body):
+        status, seconds = post(url, body, args.timeout)
+        with lock:
+            results.append((kind, status, seconds))
+
+    def bodies():
+        i = 0
+        while (args.requests is None or i < args.requests) and (
+            end is None or time.monotonic() < end
+        ):
+            yield corpus[i % len(corpus)]
+            i += 1
+
+    start = time.perf_counter()
+    if args.rps:
+        with ThreadPoolExecutor(max_workers=args.max_in_flight) as pool:
+            next_at = time.monotonic()
+            for kind, body in bodies():
+                time.sleep(max(0.0, next_at - time.monotonic()))
+                pool.submit(send, kind, body)
+                next_at += random.expovariate(args.rps)
+    else:
+        source = bodies()
+        source_lock = threading.Lock()
+
+        def loop():
+            while True:
+                with source_lock:
+                    item = next(source, None)
+                if item is None:
+                    return
+                send(*item)
+
+        threads = [threading.Thread(target=loop) for _ in range(args.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return results, time.perf_counter() - start
+
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    if not values:
+        return float("nan")
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+def summarize(results, elapsed: float, stages_before, stages_after, memory) -> dict:
+    latencies = [seconds for _, _, seconds in results]
+    ok = [seconds for _, status, seconds in results if status == 200]
+    by_kind = collections.defaultdict(list)
+    for kind, status, seconds in results:
+        if status == 200:
+            by_kind[kind].append(seconds)
+    stages = {}
+    for stage, (total, count) in stages_after.items():
+        total -= stages_before.get(stage, [0.0, 0.0])[0]
+        count -= stages_before.get(stage, [0.0, 0.0])[1]
+        if count:
+            stages[stage] = {
+                "count": int(count),
+                "mean_ms": 1e3 * total / count,
+                "total_s": total,
+            }
+    return {
+        "requests": len(results),
+        "elapsed_s": elapsed,
+        "throughput_rps": len(ok) / elapsed if elapsed else 0.0,
+        "status": dict(collections.Counter(str(s) for _, s, _ in results)),
+        "latency_ms": {
+            f"p{q}": 1e3 * percentile(latencies, q) for q in (50, 90, 95, 99)
+        },
+        "latency_max_ms": 1e3 * max(latencies, default=float("nan")),
+        "latency_by_kind_ms": {
+            kind: {f"p{q}": 1e3 * percentile(v, q) for q in (50, 99)}
+            for kind, v in sorted(by_kind.items())
+        },
+        "stages": stages,
+        "memory_mb": memory,
+    }
+
+
+def print_report(report: dict):
+    print(
+        f"\n{report['requests']} requests in {report['elapsed_s']:.1f}s, "
+        f"{report['throughput_rps']:.2f} successful req/s"
+    )
+    print("status:", ", ".join(f"{k}={v}" for k, v in report["status"].items()))
+    print(
+        "latency ms:",
+        ", ".join(f"{k}={v:.0f}" for k, v in report["latency_ms"].items()),
+        f"max={report['latency_max_ms']:.0f}",
+    )
+    for kind, latency in report["latency_by_kind_ms"].items():
+        print(f"  {kind:<8} p50={latency['p50']:.0f} p99={latency['p99']:.0f}")
+    if report["stages"]:
+        print(f"\n{'stage':<30} {'count':>7} {'mean ms':>9} {'total s':>9}")
+        for stage, s in sorted(
+            report["stages"].items(), key=lambda item: -item[1]["total_s"]
+        ):
+            print(
+                f"{stage:<30} {s['count']:>7} {s['mean_ms']:>9.1f} {s['total_s']:>9.1f}"
+            )
+    if report["memory_mb"]:
+        print(f"\n{'process':<16} {'peak rss MB':>12} {'peak pss MB':>12}")
+        for name, usage in report["memory_mb"].items():
+            print(f"{name:<16} {usage['rss']:>12.1f} {usage['pss']:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--url", help="Test a running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument(
+        "--env", action="append", default=[], help="KEY=VALUE for the server"
+    )
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", type=int, default=4)
+    load.add_argument("--rps", type=float, help="Open-loop arrival rate")
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--requests", type=int, help="Stop after this many")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds")
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=300.0,
+        help="Client timeout, also sent to the server in X-Request-Timeout",
+    )
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default="pdf=4,scanned=2,docx=3,doc=1",
+        help="Weights of document kinds (default: %(default)s)",
+    )
+    parser.add_argument("--corpus-size", type=int, default=50)
+    parser.add_argument("--vision-latency", type=float, default=0.5)
+    parser.add_argument("--vision-error-rate", type=float, default=0.0)
+    parser.add_argument("--vertex-latency", type=float, default=0.3)
+    parser.add_argument("--vertex-error-rate", type=float, default=0.0)
+    parser.add_argument("--json", type=pathlib.Path, help="Write the report here")
+    args = parser.parse_args()
+    if args.requests is None and args.duration is None:
+        args.requests = 100
+
+    corpus = make_corpus(args.corpus_size, args.mix)
+    server = None if args.url else start_server(args)
+    url = args.url or f"http://127.0.0.1:{args.port}"
+    sampler = MemorySampler(server.pid) if server else None
+    try:
+        if sampler:
+            sampler.start()
+        before = stage_totals(url)
+        results, elapsed = drive(url, corpus, args)
+        after = stage_totals(url)
+        memory = {}
+        if sampler:
+            sampler.stop()
+            for pid, peak in sampler.peak.items():
+                name = "master" if pid == server.pid else f"worker {pid}"
+                memory[name] = peak
+    finally:
+        if server:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+
+    report = summarize(results, elapsed, before, after, memory)
+    report["config"] = {
+        k: v for k, v in vars(args).items() if k not in ("json",) and v is not None
+    }
+    report["config"]["mix"] = args.mix
+    print_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2, default=str) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""Synthetic resumes with matching NER inference.
+
+The NER output has the shape returned by the Vertex AI endpoint, with
+offsets into the generated text, so the rule-based parser can be exercised
+without calling the model.
+
+Usage:
+    python -m benchmarks.synthetic --jobs 5 --seed 1
+"""
+
+import argparse
+import json
+import random
+from typing import List, Tuple
+
+FIRST_NAMES = ["Jane", "John", "Maria", "Wei", "Aisha", "Carlos", "Emily", "Tomas"]
+LAST_NAMES = ["Doe", "Smith", "Garcia", "Chen", "Johnson", "Nguyen", "Kowalski"]
+STREETS = ["Main Street", "Oak Avenue", "University Ave", "Park Drive", "Lake Rd"]
+CITIES = [
+    ("Madison", "WI"),
+    ("Milwaukee", "WI"),
+    ("Green Bay", "WI"),
+    ("Chicago", "IL"),
+    ("Minneapolis", "MN"),
+]
+EMPLOYERS = [
+    "Walmart",
+    "Target Corporation",
+    "Kwik Trip",
+    "UW Health",
+    "Menards",
+    "Epic Systems",
+    "Kohl's",
+    "Festival Foods",
+    "American Family Insurance",
+    "Aurora Health Care",
+]
+POSITIONS = [
+    "Sales Associate",
+    "Cashier",
+    "Certified Nursing Assistant",
+    "Warehouse Associate",
+    "Customer Service Representative",
+    "Shift Supervisor",
+    "Administrative Assistant",
+    "Forklift Operator",
+    "Registered Nurse",
+    "Software Developer",
+]
+DUTIES = [
+    "Greeted customers and answered questions about products and services",
+    "Operated the cash register and balanced the drawer at the end of each shift",
+    "Trained and mentored new team members on store policies",
+    "Maintained accurate inventory records and restocked shelves",
+    "Resolved customer complaints in a timely and professional manner",
+    "Assisted patients with daily living activities and recorded vital signs",
+    "Loaded and unloaded trucks, and picked orders using an RF scanner",
+    "Scheduled appointments and managed correspondence for the office",
+    "Prepared weekly reports on sales performance for the store manager",
+    "Followed all safety procedures and kept the work area clean",
+]
+SCHOOLS = [
+    "University of Wisconsin-Madison",
+    "Madison Area Technical College",
+    "Milwaukee Area Technical College",
+    "East High School",
+    "University of Minnesota",
+]
+DEGREES = [
+    "Bachelor of Science in Business Administration",
+    "Associate Degree in Nursing",
+    "High School Diploma",
+    "Master of Business Administration",
+    "Certificate in Medical Assisting",
+    "B.S. Computer Science",
+    "GED",
+]
+SKILLS = ["Microsoft Office", "Customer service", "Point of sale systems", "CPR"]
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct"]
+
+
+class _Builder:
+    """Accumulates text and the entity spans within it."""
+
+    def __init__(self):
+        self.parts = []
+        self.length = 0
+        self.entities = []
+
+    def add(self, text: str, entity: str = None):
+        if entity:
+            self.entities.append((entity, self.length, self.length + len(text)))
+        self.parts.append(text)
+        self.length += len(text)
+
+    def line(self, *pieces: Tuple[str, str]):
+        for text, entity in pieces:
+            self.add(text, entity)
+        self.add("\n")
+
+
+def _date_range(rng: random.Random, year: int, current: bool) -> Tuple[str, int]:
+    start = year
+    end = year + rng.randint(0, 3)
+    style = rng.randrange(3)
+    if style == 0:
+        text = f"{rng.choice(MONTHS)} {start} - "
+        text += "Present" if current else f"{rng.choice(MONTHS)} {end}"
+    elif style == 1:
+        text = f"{rng.randint(1, 12):02d}/{start} - "
+        text += "Present" if current else f"{rng.randint(1, 12):02d}/{end}"
+    else:
+        text = f"{start} - " + ("Present" if current else f"{end}")
+    return text, end
+
+
+def make_resume(
+    n_jobs: int = 5, n_schools: int = 2, duties: int = 4, seed: int = 0
+) -> Tuple[str, dict]:
+    """A resume and the NER inference for it.
+
+    Args:
+        n_jobs (int): Work history entries.
+        n_schools (int): Education history entries.
+        duties (int): Bullet points per job.
+        seed (int): Random seed; the same arguments give the same resume.
+
+    Returns:
+        (str, dict): The resume text, and NER inference with displayNames,
+            textSegmentStartOffsets and textSegmentEndOffsets.
+    """
+    rng = random.Random(seed)
+    b = _Builder()
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    city, state = rng.choice(CITIES)
+
+    b.line((first, "FST_NAM"), (" ", None), (last, "LAST_NAM"))
+    b.line((f"{rng.randint(10, 9999)} {rng.choice(STREETS)}", None))
+    b.line((f"{city}, {state} {rng.randint(53000, 54999)}", None))
+    phone = (
+        f"({rng.randint(200, 999)}) {rng.randint(200, 999)}-{rng.randint(1000, 9999)}"
+    )
+    b.line((phone, "PHONE_NUMBER"))
+    b.line((f"{first.lower()}.{last.lower()}@example.com", "EMAIL_ADR"))
+    b.add("\n")
+
+    b.line(("PROFESSIONAL EXPERIENCE", None))
+    year = 2021 - 3 * n_jobs
+    jobs = []
+    for i in range(n_jobs):
+        dates, year = _date_range(rng, year, current=i == n_jobs - 1)
+        jobs.append((rng.choice(EMPLOYERS), rng.choice(POSITIONS), dates))
+        year += 1
+    for employer, position, dates in reversed(jobs):
+        job_city, job_state = rng.choice(CITIES)
+        b.line((employer, "ER_NAM"), (f", {job_city}, {job_state}", None))
+        b.line((position, "POSN_NAM"), ("    ", None), (dates, None))
+        for duty in rng.sample(DUTIES, min(duties, len(DUTIES))):
+            b.line((f"• {duty}.", None))
+        b.add("\n")
+
+    b.line(("EDUCATION", None))
+    for _ in range(n_schools):
+        b.line((rng.choice(SCHOOLS), "INST_NAM"))
+        graduated = f", {rng.randint(1995, 2020)}"
+        b.line((rng.choice(DEGREES), "EDUC_DET_TXT"), (graduated, None))
+    b.add("\n")
+
+    b.line(("SKILLS", None))
+    b.line((", ".join(rng.sample(SKILLS, 3)), None))
+
+    # The endpoint does not return entities in document order
+    entities = b.entities[:]
+    rng.shuffle(entities)
+    ner_inference = {
+        "displayNames": [name for name, _, _ in entities],
+        "textSegmentStartOffsets": [str(start) for _, start, _ in entities],
+        "textSegmentEndOffsets": [str(end) for _, _, end in entities],
+    }
+    return "".join(b.parts), ner_inference
+
+
+def make_corpus(n: int, n_jobs: int = 5, seed: int = 0) -> List[Tuple[str, dict]]:
+    """n resumes with between 1 and 2 * n_jobs jobs each."""
+    rng = random.Random(seed)
+    return [
+        make_resume(
+            n_jobs=rng.randint(1, 2 * n_jobs),
+            n_schools=rng.randint(1, 3),
+            seed=seed * 1_000_003 + i,
+        )
+        for i in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=5)
+    parser.add_argument("--schools", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    text, ner_inference = make_resume(args.jobs, args.schools, seed=args.seed)
+    print(text)
+    print(json.dumps(ner_inference))
+
+
+if __name__ == "__main__":
+    main()
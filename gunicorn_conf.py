@@ -1,6 +1,11 @@
+import gc
 import json
 import multiprocessing
 import os
+import shutil
+import signal
+import threading
+import time
 
 workers_per_core_str = os.getenv("WORKERS_PER_CORE", "1")
 max_workers_str = os.getenv("MAX_WORKERS", "5")
@@ -35,6 +40,15 @@ use_errorlog = errorlog_var or None
 graceful_timeout_str = os.getenv("GRACEFUL_TIMEOUT", "120")
 timeout_str = os.getenv("TIMEOUT", "300")
 keepalive_str = os.getenv("KEEP_ALIVE", "5")
+preload_str = os.getenv("PRELOAD_APP", "false")
+prometheus_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR", "")
+# Workers are replaced after this many requests, plus up to the jitter so
+# they don't all restart at once, or once their RSS passes MAX_WORKER_RSS_MB.
+# Either way the worker finishes its in-flight requests first. 0 disables.
+max_requests_str = os.getenv("MAX_REQUESTS", "0")
+max_requests_jitter_str = os.getenv("MAX_REQUESTS_JITTER", "0")
+max_worker_rss_mb = float(os.getenv("MAX_WORKER_RSS_MB", "0"))
+rss_check_interval = float(os.getenv("RSS_CHECK_INTERVAL", "10"))
 
 # Gunicorn config variables
 loglevel = use_loglevel
@@ -46,6 +60,9 @@ accesslog = use_accesslog
 graceful_timeout = int(graceful_timeout_str)
 timeout = int(timeout_str)
 keepalive = int(keepalive_str)
+preload_app = preload_str.lower() in ("1", "true", "yes")
+max_requests = int(max_requests_str)
+max_requests_jitter = int(max_requests_jitter_str)
 
 
 # For debugging and testing
@@ -56,6 +73,10 @@ log_data = {
     "graceful_timeout": graceful_timeout,
     "timeout": timeout,
     "keepalive": keepalive,
+    "preload_app": preload_app,
+    "prometheus_dir": prometheus_dir,
+    "max_requests": max_requests,
+    "max_requests_jitter": max_requests_jitter,
     "errorlog": errorlog,
     "accesslog": accesslog,
     # Additional, non-gunicorn variables
@@ -63,5 +84,75 @@ log_data = {
     "use_max_workers": use_max_workers,
     "host": host,
     "port": port,
+    "max_worker_rss_mb": max_worker_rss_mb,
 }
 print(json.dumps(log_data))
+
+if prometheus_dir:
+    # Samples left over from a previous run would be summed with this one's
+    shutil.rmtree(prometheus_dir, ignore_errors=True)
+    os.makedirs(prometheus_dir)
+
+
+def memory_usage(pid):
+    """RSS, PSS and shared memory of a process in MiB, from /proc."""
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    except OSError:
+        return {}
+    return {
+        "rss_mb": round(fields.get("Rss", 0), 1),
+        "pss_mb": round(fields.get("Pss", 0), 1),
+        "shared_mb": round(
+            fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0), 1
+        ),
+    }
+
+
+# Server hooks
+def when_ready(server):
+    if preload_app:
+        # Keep the preloaded objects out of reach of the garbage collector so
+        # collections in the workers don't write to, and unshare, their pages
+        gc.freeze()
+    server.log.info(json.dumps({"master": os.getpid(), **memory_usage(os.getpid())}))
+
+
+def watch_rss(worker):
+    """Stop the worker gracefully once its RSS passes max_worker_rss_mb.
+
+    SIGTERM makes the worker stop accepting connections and exit after its
+    in-flight requests, and the master then forks a fresh one. RSS includes
+    the pages still shared with a preloading master.
+    """
+    while True:
+        time.sleep(rss_check_interval)
+        usage = memory_usage(worker.pid)
+        if usage.get("rss_mb", 0) > max_worker_rss_mb:
+            worker.log.warning(
+                json.dumps({"worker": worker.pid, "recycling": True, **usage})
+            )
+            os.kill(worker.pid, signal.SIGTERM)
+            return
+
+
+def post_worker_init(worker):
+    # Per-worker startup report. PSS splits shared pages between the
+    # processes using them, so the sum over workers is the real footprint.
+    worker.log.info(json.dumps({"worker": worker.pid, **memory_usage(worker.pid)}))
+    if max_worker_rss_mb > 0:
+        threading.Thread(
+            target=watch_rss, args=(worker,), name="rss-watchdog", daemon=True
+        ).start()
+
+
+def child_exit(server, worker):
+    if prometheus_dir:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
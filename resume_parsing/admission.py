@@ -0,0 +1,115 @@
+import contextlib
+import io
+import logging
+import math
+import os
+import threading
+
+import fitz
+from fastapi import HTTPException, status
+
+from resume_parsing import deadline, filetypes, metrics
+
+logger = logging.getLogger()
+logger.setLevel(level=logging.INFO)
+
+# Work admitted at once by each worker, in cost units. A resume costs one
+# unit plus ADMISSION_PAGE_COST per PDF page and ADMISSION_MB_COST per MB.
+ADMISSION_CAPACITY = float(os.getenv("ADMISSION_CAPACITY", "100"))
+ADMISSION_PAGE_COST = float(os.getenv("ADMISSION_PAGE_COST", "1"))
+ADMISSION_MB_COST = float(os.getenv("ADMISSION_MB_COST", "2"))
+# Requests that do not fit wait up to ADMISSION_MAX_WAIT seconds, in a line
+# of at most ADMISSION_MAX_QUEUE requests
+ADMISSION_MAX_WAIT = float(os.getenv("ADMISSION_MAX_WAIT", "10"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+
+
+def estimate_cost(content: bytes, file_extension: str) -> float:
+    """Estimate the cost of a resume from its size and page count."""
+    cost = 1 + ADMISSION_MB_COST * len(content) / 2**20
+    if filetypes.sniff(content) == filetypes.PDF:
+        try:
+            with io.BytesIO(content) as b:
+                pdf = fitz.open(stream=b, filetype="pdf")
+                try:
+                    page_count = pdf.page_count
+                finally:
+                    pdf.close()
+        except RuntimeError:
+            page_count = 0  # Rejected as invalid by doc_extractor
+        cost += ADMISSION_PAGE_COST * page_count
+    return cost
+
+
+class AdmissionController:
+    """Caps the total estimated cost of the requests in flight.
+
+    A request that does not fit waits for capacity. It is rejected with 429
+    when too many requests are already waiting, and with 503 when capacity
+    does not free up in time. A request costing more than the capacity is
+    admitted only when nothing else is in flight.
+    """
+
+    def __init__(self, capacity: float, max_queue: int, max_wait: float):
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.in_flight = 0.0
+        self.waiting = 0
+        self._cond = threading.Condition()
+
+    def _fits(self, cost: float) -> bool:
+        return self.in_flight + cost <= self.capacity
+
+    @contextlib.contextmanager
+    def admit(self, cost: float):
+        cost = min(cost, self.capacity)
+        with self._cond:
+            if not self._fits(cost):
+                if self.waiting >= self.max_queue:
+                    metrics.ADMISSIONS.labels("rejected_busy").inc()
+                    logger.warning("Rejected a resume of cost %.1f: queue full", cost)
+                    raise HTTPException(
+                        status.HTTP_429_TOO_MANY_REQUESTS,
+                        "Too many resumes in progress, try again later.",
+                        headers={"Retry-After": str(math.ceil(self.max_wait))},
+                    )
+                left = deadline.remaining()
+                wait = self.max_wait if left is None else min(self.max_wait, left)
+                self.waiting += 1
+                try:
+                    admitted = self._cond.wait_for(lambda: self._fits(cost), wait)
+                finally:
+                    self.waiting -= 1
+                if not admitted:
+                    metrics.ADMISSIONS.labels("rejected_timeout").inc()
+                    logger.warning("Rejected a resume of cost %.1f: timed out", cost)
+                    raise HTTPException(
+                        status.HTTP_503_SERVICE_UNAVAILABLE,
+                        "Server is at capacity, try again later.",
+                        headers={"Retry-After": str(math.ceil(self.max_wait))},
+                    )
+                metrics.ADMISSIONS.labels("queued").inc()
+            else:
+                metrics.ADMISSIONS.labels("admitted").inc()
+            self.in_flight += cost
+        metrics.IN_FLIGHT_COST.inc(cost)
+        try:
+            yield
+        finally:
+            metrics.IN_FLIGHT_COST.dec(cost)
+            with self._cond:
+                self.in_flight -= cost
+                self._cond.notify_all()
+
+
+_controller = AdmissionController(
+    ADMISSION_CAPACITY, ADMISSION_MAX_QUEUE, ADMISSION_MAX_WAIT
+)
+
+
+def admit(content: bytes, file_extension: str):
+    """Admit a resume into this worker, or reject it. See AdmissionController."""
+    if ADMISSION_CAPACITY <= 0:
+        return contextlib.nullcontext()
+    return _controller.admit(estimate_cost(content, file_extension))
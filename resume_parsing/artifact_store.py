@@ -0,0 +1,100 @@
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import tempfile
+from typing import Any, Callable, Optional
+
+from resume_parsing import metrics
+
+logger = logging.getLogger()
+logger.setLevel(level=logging.INFO)
+
+ARTIFACT_STORE_PATH = os.getenv("ARTIFACT_STORE_PATH", "")
+
+
+def digest(*parts) -> str:
+    """Content hash of one or more artifact inputs.
+
+    Args:
+        parts: bytes, str or JSON-serializable values.
+
+    Returns:
+        str: Hex-encoded SHA-256 digest.
+    """
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        elif not isinstance(part, (bytes, bytearray, memoryview)):
+            part = json.dumps(part, sort_keys=True, default=str).encode("utf-8")
+        h.update(len(part).to_bytes(8, "big"))
+        h.update(part)
+    return h.hexdigest()
+
+
+def source_version(module) -> str:
+    """Version tag derived from the source file of a module.
+
+    Any edit to the module changes the tag, so artifacts produced by
+    older code are not reused.
+    """
+    with open(module.__file__, "rb") as f:
+        return digest(f.read())[:12]
+
+
+class ArtifactStore:
+    """Local, content-addressed store for pipeline stage artifacts.
+
+    Artifacts are JSON documents laid out as
+    [root]/[stage]/[version]/[key[:2]]/[key].json
+    """
+
+    def __init__(self, root: str):
+        self.root = pathlib.Path(root)
+
+    def path(self, stage: str, version: str, key: str) -> pathlib.Path:
+        return self.root / stage / version / key[:2] / f"{key}.json"
+
+    def get(self, stage: str, version: str, key: str) -> Optional[Any]:
+        """Load an artifact, or None if it was never stored."""
+        try:
+            with open(self.path(stage, version, key), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError as err:
+            logger.warning(f"Ignoring corrupt {stage} artifact [{key}]: {err}")
+            return None
+
+    def put(self, stage: str, version: str, key: str, value: Any):
+        """Atomically write an artifact."""
+        path = self.path(stage, version, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f, default=str)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def cached(self, stage: str, version: str, key: str, compute: Callable[[], Any]):
+        """Return the stored artifact, computing and storing it on a miss."""
+        value = self.get(stage, version, key)
+        metrics.count_cache(f"artifact_{stage}", value is not None, value is None)
+        if value is None:
+            value = compute()
+            self.put(stage, version, key, value)
+        else:
+            logger.debug("Reusing %s artifact [%s/%s]", stage, version, key)
+        return value
+
+
+def get_store() -> Optional[ArtifactStore]:
+    """The configured artifact store, or None when persistence is disabled."""
+    if not ARTIFACT_STORE_PATH:
+        return None
+    return ArtifactStore(ARTIFACT_STORE_PATH)
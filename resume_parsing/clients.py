@@ -0,0 +1,59 @@
+import os
+import threading
+
+from google.cloud import aiplatform, vision
+
+# gRPC channels must not be shared across fork(). Clients are created lazily
+# in the process that uses them, and dropped in the child after a fork, so
+# state preloaded in the gunicorn master never carries a channel into a
+# worker.
+_clients = {}
+_lock = threading.Lock()
+_factories = {
+    "vision": vision.ImageAnnotatorClient,
+    "endpoint": aiplatform.Endpoint,
+}
+
+
+def _client(key, factory):
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = factory()
+    return client
+
+
+def _reset_after_fork():
+    global _lock
+    _clients.clear()
+    _lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def set_factory(kind: str, factory):
+    """Replace the constructor of a kind of client, "vision" or "endpoint".
+
+    Used to run the app against local stand-ins, e.g. for load tests.
+    """
+    if kind not in _factories:
+        raise ValueError(f"Unknown client kind [{kind}]")
+    with _lock:
+        _factories[kind] = factory
+        _clients.clear()
+
+
+def get_vision_client() -> vision.ImageAnnotatorClient:
+    """The Cloud Vision client of this process."""
+    return _client("vision", lambda: _factories["vision"]())
+
+
+def get_endpoint(endpoint_id: str, project: str, location: str) -> aiplatform.Endpoint:
+    """The Vertex AI endpoint client of this process."""
+    return _client(
+        ("endpoint", endpoint_id, project, location),
+        lambda: _factories["endpoint"](endpoint_id, project=project, location=location),
+    )
@@ -8,12 +8,54 @@ from wsgiref.simple_server import demo_app
 
 from rapidfuzz import fuzz
 
+from resume_parsing import deadline, metrics
+from resume_parsing.resume_text import ResumeText
 from resume_parsing.utils import align
 
 # from utils import align
 
 strip_chars = punctuation.replace(".", "") + " \n\t\s"
 
+# Patterns are compiled once at import so they are shared by preforked workers
+STREET_ADDRESS_PATTERN = re.compile(
+    r"\d{1,4} [\w\s]{1,20}(?:street|st|avenue|ave|road|rd|highway|"
+    r"hwy|square|sq|trail|trl|drive|dr|court|ct|park|parkway|pkwy|"
+    r"circle|cir|boulevard|blvd)\W?(?=\s|$)",
+    re.IGNORECASE,
+)
+ZIP_PATTERN = re.compile(r"\b\d{5}(?:[-\s]\d{4})?\b")
+SECTION_PATTERN = re.compile(
+    r"(reference|education|volunteer|skill|certificat|military|award"
+    r"|interest|additional|professional development|assessment|\n\n\n)",
+    re.IGNORECASE,
+)
+_written_months = (
+    r"jan(?:\.|uary)?|feb(?:\.|ruary)?|mar(?:\.|ch)?|apr(?:\.|il)?|may"
+    r"|jun(?:\.|e)?|jul(?:\.|y)?|aug(?:\.|ust)?|sept(?:\.|ember)?|oct"
+    r"(?:\.|ober)?|nov(?:\.|ember)?|dec(?:\.|ember)"
+)
+_split_pattern = r"[^\w]?(?:-|–|to|thru|through)?[^\w]?"
+_date_pattern = (
+    r"(?:\d{1,2}\/\d{1,2}\/\d{2,4})|"  # mm/dd/yy | mm/dd/yyyy
+    r"(?:(?<![\d\/])(?:1[0-2]|0?[1-9])\/\d{2,4}(?<!\/))|"  # mm/yyyy | mm/yy
+    fr"(?:(?:{_written_months})?(?:[^\w]+\d{{1,2}},)?[^\w\/]*(?:19|20)\d{{2}})|"  # noqa: E501 mmm d, yyyy | yyyy
+    r"(?:current|present)"
+)
+_combined_pattern = f"({_date_pattern})(?:{_split_pattern}({_date_pattern}))?"
+DATE_PATTERN = re.compile(_combined_pattern, re.IGNORECASE)
+STATE_PATTERN = re.compile(
+    r",\s*(?:AL|Alabama|AK|Alaska|AZ|Arizona|AR|Arkansas"
+    r"|CA|California|CO|Colorado|CT|Connecticut|DE|Delaware|FL|Florida|GA|Georgia"
+    r"|HI|Hawaii|ID|Idaho|IL|Illinois|IN|Indiana|IA|Iowa|KS|Kansas"
+    r"|KY|Kentucky|LA|Louisiana|ME|Maine|MD|Maryland|MA|Massachusetts|MI|Michigan"
+    r"|MN|Minnesota|MS|Mississippi|MO|Missouri|MT|Montana|NE|Nebraska|NV|Nevada"
+    r"|NH|New Hampshire|NJ|New Jersey|NM|New Mexico|NY|New York|NC|North Carolina"
+    r"|ND|North Dakota|OH|Ohio|OK|Oklahoma|OR|Oregon|PA|Pennsylvania|RI|Rhode Island"
+    r"|SC|South Carolina|SD|South Dakota|TN|Tennessee|TX|Texas|UT|Utah|VT|Vermont"
+    r"|VA|Virginia|WA|Washington|WV|West Virginia|WI|Wisconsin|WY|Wyoming)"
+)
+EMAIL_PATTERN = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b")
+
 
 def parse(ner_inference: dict, resume: str):
     """Executes rule-based parsing on a document.
@@ -25,6 +67,7 @@ def parse(ner_inference: dict, resume: str):
     Returns:
         dict: A dictionary with the parsed resume.
     """
+    resume = ResumeText.of(resume)
     job_history = []
     identification_fields = []
 
@@ -42,12 +85,15 @@ def parse(ner_inference: dict, resume: str):
         return_indices=True,
     )
 
+    deadline.check("parser.get_description")
     descriptions = get_description(ner_inference, resume)
+    deadline.check("parser.get_dates")
     dates = get_dates(ner_inference, resume, position_indices)
     phone = get_phone_numbers(ner_inference, resume)
     address = get_addresses(resume)
     cert = get_certificates(resume)
 
+    deadline.check("parser.align_education")
     edu_history, degrees = align_education(ner_inference, resume)
     educ_level_cd = [standardize_degree(d) for d in degrees]
     fname = first_names[0].strip(strip_chars) if first_names else None
@@ -104,12 +150,13 @@ def parse(ner_inference: dict, resume: str):
     }
 
 
-def get_phone_numbers(ner_inference: dict, resume: str):
+@metrics.timer("parser.get_phone_numbers")
+def get_phone_numbers(ner_inference: dict, resume: ResumeText):
     """Extracts phone numbers.
 
     Args:
         ner_inference (dict): The NER prediction response.
-        resume (str): Resume text.
+        resume (ResumeText): Resume text.
 
     Returns:
         [tuple]: List containing the area code and the 7 digit number.
@@ -135,22 +182,16 @@ def get_phone_numbers(ner_inference: dict, resume: str):
     ]
 
 
-def get_addresses(resume: str):
+@metrics.timer("parser.get_addresses")
+def get_addresses(resume: ResumeText):
     """Extracts addresses.
 
     Args:
-        resume (str): The resume text.
+        resume (ResumeText): The resume text.
 
     Returns:
         [tuple]: Nested list containing the street address and zip code.
     """
-    street_address_pattern = re.compile(
-        r"\d{1,4} [\w\s]{1,20}(?:street|st|avenue|ave|road|rd|highway|"
-        r"hwy|square|sq|trail|trl|drive|dr|court|ct|park|parkway|pkwy|"
-        r"circle|cir|boulevard|blvd)\W?(?=\s|$)",
-        re.IGNORECASE,
-    )
-    zip_pattern = re.compile(r"\b\d{5}(?:[-\s]\d{4})?\b")
     heading = [
         "reference",
         "education",
@@ -165,21 +206,22 @@ def get_addresses(resume: str):
     for h in heading:
         reduc_text = reduc_text.split(h)[0]
 
-    address = re.findall(street_address_pattern, reduc_text)
+    address = re.findall(STREET_ADDRESS_PATTERN, reduc_text)
     address = [re.sub(r"\W+", " ", i) for i in list(address)]
     address = [" ".join(i.split()) for i in address]
 
-    zip_code = re.findall(zip_pattern, reduc_text)
+    zip_code = re.findall(ZIP_PATTERN, reduc_text)
 
     return [(a, z) for a, z in zip(zip_code, address)]
 
 
-def get_degrees(ner_inference: dict, resume: str):
+@metrics.timer("parser.get_degrees")
+def get_degrees(ner_inference: dict, resume: ResumeText):
     """Extracts academic degrees.
 
     Args:
         ner_inference (dict): The NER prediction response.
-        resume (str): Resume text.
+        resume (ResumeText): Resume text.
 
     Returns:
         [str]: List containing the degrees.
@@ -193,19 +235,20 @@ def get_degrees(ner_inference: dict, resume: str):
     return degrees
 
 
-def get_certificates(resume: str):
+@metrics.timer("parser.get_certificates")
+def get_certificates(resume: ResumeText):
     """Extracts educational certificates.
 
     Args:
-        resume (str): The resume text.
+        resume (ResumeText): The resume text.
 
     Returns:
         [str]: List containing the certifications.
     """
     certs = []
-    lines = resume.split("\n")
-    for line in lines:
-        if "cert" in line.lower():
+    resume = ResumeText.of(resume)
+    for line, folded in zip(resume.lines, resume.folded_lines):
+        if "cert" in folded:
             match = re.findall(r"\b[A-Z].*?Cert[a-z]*\b", line)
             if match:
                 for m in match:
@@ -213,12 +256,13 @@ def get_certificates(resume: str):
     return certs
 
 
-def get_description(ner_inference: dict, resume: str):
+@metrics.timer("parser.get_description")
+def get_description(ner_inference: dict, resume: ResumeText):
     """Extracts job descriptions related to job positions.
 
     Args:
         ner_inference (dict): The NER prediction response.
-        resume (str): Resume text.
+        resume (ResumeText): Resume text.
 
     Returns:
         [dict]: List of job descriptions keyed by job positions.
@@ -269,12 +313,7 @@ def get_description(ner_inference: dict, resume: str):
         )  # + 1
 
         if len(left_align) == i + 1:  # identify last job provided
-            section_pattern = re.compile(
-                r"(reference|education|volunteer|skill|certificat|military|award"
-                r"|interest|additional|professional development|assessment|\n\n\n)",
-                re.IGNORECASE,
-            )
-            description = re.split(section_pattern, resume[start:])[0]
+            description = re.split(SECTION_PATTERN, resume[start:])[0]
 
         else:  # index based on next job's start position
             comp_end = (
@@ -308,14 +347,15 @@ def get_description(ner_inference: dict, resume: str):
     return work_history
 
 
+@metrics.timer("parser.extract_entity_text")
 def extract_entity_text(
-    ner_inference: dict, resume: str, entity: str, return_indices: bool = False
+    ner_inference: dict, resume: ResumeText, entity: str, return_indices: bool = False
 ):
     """Extract an entity from the NER prediction.
 
     Args:
         ner_inference (dict): The NER prediction response.
-        resume (str): Resume text.
+        resume (ResumeText): Resume text.
         entity (str): The entity/field.
         return_indices (bool, optional): True to return entity indices.
             Defaults to False.
@@ -357,12 +397,13 @@ def extract_entity_text(
     return entity_values
 
 
-def get_dates(ner_inference: dict, resume: str, position_indices):
+@metrics.timer("parser.get_dates")
+def get_dates(ner_inference: dict, resume: ResumeText, position_indices):
     """Extracts dates related with job positions.
 
     Args:
         ner_inference (dict): The NER prediction response.
-        resume (str): Resume text.
+        resume (ResumeText): Resume text.
         position_indices ([tuple]): The start and end index of job positions.
 
     Returns:
@@ -373,39 +414,21 @@ def get_dates(ner_inference: dict, resume: str, position_indices):
     if not position_indices:
         return []
 
-    written_months = (
-        r"jan(?:\.|uary)?|feb(?:\.|ruary)?|mar(?:\.|ch)?|apr(?:\.|il)?|may"
-        r"|jun(?:\.|e)?|jul(?:\.|y)?|aug(?:\.|ust)?|sept(?:\.|ember)?|oct"
-        r"(?:\.|ober)?|nov(?:\.|ember)?|dec(?:\.|ember)"
-    )
-    split_pattern = r"[^\w]?(?:-|–|to|thru|through)?[^\w]?"
-    date_pattern = (
-        r"(?:\d{1,2}\/\d{1,2}\/\d{2,4})|"  # mm/dd/yy | mm/dd/yyyy
-        r"(?:(?<![\d\/])(?:1[0-2]|0?[1-9])\/\d{2,4}(?<!\/))|"  # mm/yyyy | mm/yy
-        fr"(?:(?:{written_months})?(?:[^\w]+\d{{1,2}},)?[^\w\/]*(?:19|20)\d{{2}})|"  # noqa: E501 mmm d, yyyy | yyyy
-        r"(?:current|present)"
-    )
-    combined_pattern = f"({date_pattern})(?:{split_pattern}({date_pattern}))?"
-    pattern1 = re.compile(combined_pattern, re.IGNORECASE)
-
+    resume = ResumeText.of(resume)
     for pos in position_indices:
         s, e = pos
         positions.append(resume[int(s) : int(e)].strip())
 
-        start_lines = [m.start() for m in re.finditer(r"\n", resume[: int(s)])]
-        start_window = (
-            start_lines[-3]
-            if len(start_lines) > 2
-            else s - 100  # Search up to 3 line breaks above
-        )
-        end_lines = [m.start() for m in re.finditer(r"\n", resume[int(e) :])]
+        start_window = resume.line_break_before(int(s), 3)
+        if start_window is None:
+            start_window = s - 100  # Search up to 3 line breaks above
         end_window = (
-            e + end_lines[1]
-            if len(end_lines) > 2
+            resume.line_break_after(int(e), 2)
+            if resume.line_breaks_after(int(e)) > 2
             else e + 100  # Search up to 2 line breaks below
         )
-        windowed_text = " ".join(resume[start_window:end_window].split())
-        experience = re.findall(pattern1, windowed_text)
+        windowed_text = resume.collapsed(start_window, end_window)
+        experience = re.findall(DATE_PATTERN, windowed_text)
         if len(experience) > 0:
             dates.append(experience)
         else:
@@ -417,6 +440,7 @@ def get_dates(ner_inference: dict, resume: str, position_indices):
     return result
 
 
+@metrics.timer("parser.standardize_degree")
 def standardize_degree(degree: str):
     """Standardize degrees based on education level.
 
@@ -436,53 +460,54 @@ def standardize_degree(degree: str):
         "PHD": 7,
     }
 
-    if "bachelor" in degree.lower():
+    folded = degree.lower()
+    if "bachelor" in folded:
         result = "Bachelor"
-    elif "b.s." in degree.lower():
+    elif "b.s." in folded:
         result = "Bachelor"
 
     elif "BS" in degree:
         result = "Bachelor"
 
-    elif "b.a." in degree.lower():
+    elif "b.a." in folded:
         result = "Bachelor"
 
-    elif "associate degree" in degree.lower():
+    elif "associate degree" in folded:
         result = "Associate"
 
-    elif "associates" in degree.lower():
+    elif "associates" in folded:
         result = "Associate"
 
-    elif "associate" in degree.lower():  # dangerous
+    elif "associate" in folded:  # dangerous
         result = "Associate"
 
-    elif "master of" in degree.lower():
+    elif "master of" in folded:
         result = "Masters"
-    elif "masters" in degree.lower():
+    elif "masters" in folded:
         result = "Masters"
 
     elif "MBA" in degree:  # dangerous
         result = "Masters"
 
-    elif "master" in degree.lower():  # dangerous
+    elif "master" in folded:  # dangerous
         result = "Masters"
 
-    elif "m.s." in degree.lower():
+    elif "m.s." in folded:
         result = "Masters"
 
     elif "MS" in degree:
         result = "Masters"
 
-    elif "doctora" in degree.lower():
+    elif "doctora" in folded:
         result = "PHD"
 
-    elif "ph.d" in degree.lower():
+    elif "ph.d" in folded:
         result = "PHD"
 
-    elif "phd" in degree.lower():
+    elif "phd" in folded:
         result = "PHD"
 
-    elif "certificat" in degree.lower():
+    elif "certificat" in folded:
         result = "Cert"
     elif any(fuzz.ratio(i.lower(), "bachelor") > 90 for i in degree.split()):
         result = "Bachelor"
@@ -494,13 +519,13 @@ def standardize_degree(degree: str):
         result = "Associate"
     elif any(fuzz.ratio(i.lower(), "certificate") > 60 for i in degree.split()):
         result = "Cert"
-    elif "high school" in degree.lower():
+    elif "high school" in folded:
         result = "HighSchool"
     elif "HS" in degree:
         result = "HighSchool"
-    elif "ged" in "".join(degree.lower().split(".")):
+    elif "ged" in "".join(folded.split(".")):
         result = "HighSchool"
-    elif "hsed" in "".join(degree.lower().split(".")):
+    elif "hsed" in "".join(folded.split(".")):
         result = "HighSchool"
     else:
         result = "Other"
@@ -508,6 +533,7 @@ def standardize_degree(degree: str):
     return education_level[result]
 
 
+@metrics.timer("parser.process_dates")
 def process_dates(dates: list):
     """Post-processing of extracted dates.
 
@@ -624,12 +650,13 @@ def process_dates(dates: list):
     return processed_dates
 
 
-def align_education(ner_inference: dict, resume: str):
+@metrics.timer("parser.align_education")
+def align_education(ner_inference: dict, resume: ResumeText):
     """Pairs instituitions with the respective education description.
 
     Args:
         ner_inference (dict): The NER prediction response.
-        resume (str): Resume text.
+        resume (ResumeText): Resume text.
 
     Returns:
         edu_history [dict]: List of education history.
@@ -671,6 +698,7 @@ def align_education(ner_inference: dict, resume: str):
     return edu_history, degrees
 
 
+@metrics.timer("parser.get_job_history")
 def get_job_history(
     dates: List[dict],
     work_history: List[dict],
@@ -719,19 +747,7 @@ def get_job_history(
                 if idx == 0 and len(l) < 20:
                     continue
 
-                state_pattern = re.compile(
-                    r",\s*(?:AL|Alabama|AK|Alaska|AZ|Arizona|AR|Arkansas"
-                    r"|CA|California|CO|Colorado|CT|Connecticut|DE|Delaware|FL|Florida|GA|Georgia"
-                    r"|HI|Hawaii|ID|Idaho|IL|Illinois|IN|Indiana|IA|Iowa|KS|Kansas"
-                    r"|KY|Kentucky|LA|Louisiana|ME|Maine|MD|Maryland|MA|Massachusetts|MI|Michigan"
-                    r"|MN|Minnesota|MS|Mississippi|MO|Missouri|MT|Montana|NE|Nebraska|NV|Nevada"
-                    r"|NH|New Hampshire|NJ|New Jersey|NM|New Mexico|NY|New York|NC|North Carolina"
-                    r"|ND|North Dakota|OH|Ohio|OK|Oklahoma|OR|Oregon|PA|Pennsylvania|RI|Rhode Island"
-                    r"|SC|South Carolina|SD|South Dakota|TN|Tennessee|TX|Texas|UT|Utah|VT|Vermont"
-                    r"|VA|Virginia|WA|Washington|WV|West Virginia|WI|Wisconsin|WY|Wyoming)"
-                )
-
-                state_match = re.search(state_pattern, l)
+                state_match = re.search(STATE_PATTERN, l)
                 if state_match:
                     state_counts += 1
                     if state_counts == 2:
@@ -768,6 +784,7 @@ def get_job_history(
     return job_history
 
 
+@metrics.timer("parser.validate_emails")
 def validate_emails(emails: List[str]) -> Optional[str]:
     """Find best match for emails
 
@@ -777,10 +794,9 @@ def validate_emails(emails: List[str]) -> Optional[str]:
     Returns:
         str: The email.
     """
-    email_pattern = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b")
     match = None
     for e in emails:
-        match = re.search(email_pattern, e)
+        match = re.search(EMAIL_PATTERN, e)
         if match:
             match = match[0]
             break
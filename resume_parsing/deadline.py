@@ -0,0 +1,64 @@
+import contextlib
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+# Just under the gunicorn worker timeout, so a request fails cleanly before
+# its worker is killed
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "270"))
+TIMEOUT_HEADER = "x-request-timeout"
+
+# Monotonic time by which the current request must finish. Context variables
+# follow the request into asyncio tasks, such as the OCR batches.
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+def request_timeout(header: Optional[str] = None) -> float:
+    """The time budget of a request, shortened by the client's own timeout.
+
+    Args:
+        header (str): The X-Request-Timeout header in seconds, if sent.
+
+    Returns:
+        float: Seconds.
+    """
+    try:
+        requested = float(header) if header else REQUEST_TIMEOUT
+    except ValueError:
+        requested = REQUEST_TIMEOUT
+    return max(0.0, min(requested, REQUEST_TIMEOUT))
+
+
+@contextlib.contextmanager
+def limit(seconds: float):
+    """Set a deadline for the block. Nested deadlines can only shorten it."""
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the deadline, or None when there is none."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check(stage: str):
+    """Stop work that can no longer finish in time.
+
+    Raises:
+        HTTPException: HTTP 504 if the deadline has passed.
+    """
+    left = remaining()
+    if left is not None and left <= 0:
+        raise HTTPException(
+            status.HTTP_504_GATEWAY_TIMEOUT,
+            f"Deadline exceeded before {stage}.",
+        )
@@ -1,76 +1,107 @@
-import asyncio
-import io
+import concurrent.futures
+import contextlib
 import json  # noqa: F401
 import logging
 import os  # noqa: F401
 import pathlib
 import re
 import tempfile
-import time
 from base64 import b64decode  # noqa: F401
-from typing import List
+from typing import Iterable, Iterator
 
 import fitz
-import proto
 import textract
 from fastapi import FastAPI, HTTPException, status
 from google.cloud import vision  # noqa: F401
 
-from resume_parsing import utils  # noqa: I202, F401
+from resume_parsing import (  # noqa: I202, F401
+    deadline,
+    filetypes,
+    metrics,
+    ocr,
+    pdf_pages,
+    rtf,
+    utils,
+)
 
 # import utils  # noqa: I202, F401
 
 app = FastAPI()
 logger = logging.getLogger()
 logger.setLevel(level=logging.INFO)
-loop = asyncio.get_event_loop()
 STAGING_PATH = os.getenv("STAGING_PATH", "gs://wi_test_bucket/tests")
 
+# Limits on the PDFs read: 0 disables each of them
+PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(50 * 2**20)))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "100"))
+# Characters after which no more pages are read, text layer or OCR
+PDF_MAX_TEXT = int(os.getenv("PDF_MAX_TEXT", "500000"))
 
-def process_by_filetype(file: str, file_extension: str) -> str:
-    """Route processing based on the extension string.
+
+def process_by_filetype(content: bytes, file_extension: str) -> str:
+    """Route processing based on the content of the file.
+
+    The type is sniffed from the leading bytes, so a file is read by the right
+    extractor whatever its extension says. The extension is only used when
+    the content is not recognized.
 
     Args:
-        document_path (str): A GCS URI containing the document.
+        content (bytes): The decoded file.
+        file_extension (str): The file extension of the resume.
 
     Raises:
-        HTTPException: HTTP 400 if the file extension is not supported
+        HTTPException: HTTP 400 if the file type is not supported
 
     Returns:
         str: Path to the extracted text file
     """
-    if re.match(r".*\.doc[x]?$", file_extension, re.IGNORECASE):
-        result = process_word(file, file_extension)
-    elif re.match(r".*\.pdf[x]?$", file_extension, re.IGNORECASE):
-        result = process_pdf(file, file_extension)
-    else:
-        raise HTTPException(
-            status.HTTP_400_BAD_REQUEST,
-            "Document type not supported. Must provide a .doc/.docx/.pdf file.",
-        )
-
-    return result
-
-
-def process_word(file: str, file_extension: str) -> str:
+    kind = filetypes.sniff(content)
+    if kind == filetypes.TEXT and not re.match(
+        r".*\.(doc[x]?|pdf[x]?|rtf|txt)$", file_extension, re.IGNORECASE
+    ):
+        kind = None
+    if kind is None:
+        if re.match(r".*\.doc[x]?$", file_extension, re.IGNORECASE):
+            metrics.FILES.labels(file_extension.lower()[-4:].lstrip(".")).inc()
+            return process_word(content, file_extension)
+        elif re.match(r".*\.pdf[x]?$", file_extension, re.IGNORECASE):
+            kind = filetypes.PDF
+        else:
+            metrics.FILES.labels("unsupported").inc()
+            raise HTTPException(
+                status.HTTP_400_BAD_REQUEST,
+                "Document type not supported. Must provide a .doc/.docx/.pdf file.",
+            )
+
+    metrics.FILES.labels(kind).inc()
+    if kind == filetypes.PDF:
+        return process_pdf(content, file_extension)
+    elif kind == filetypes.RTF:
+        with metrics.timed("extract_rtf"):
+            return rtf.to_text(content)
+    elif kind == filetypes.TEXT:
+        return filetypes.decode_text(content)
+    return process_word(content, f".{kind}")
+
+
+def process_word(content: bytes, file_extension: str) -> str:
     """Process a Microsoft Word document.
 
     Attempts to extract a Microsoft Word document. Also handles RTF format.
 
     Args:
-        document_path (str): A GCS URI containing the document.
+        content (bytes): The decoded file.
+        file_extension (str): The file extension of the resume.
 
     Returns:
         str: Path to the extracted text file
     """
     logging.debug("Processing as a Word document")
 
-    t = time.time()
-    with tempfile.TemporaryDirectory() as dirpath:
+    with metrics.timed("extract_word"), tempfile.TemporaryDirectory() as dirpath:
         tempf = pathlib.Path(dirpath) / f"local{file_extension}"
         with open(tempf, "wb") as f:
-            f.write(b64decode(file))
-            logger.debug(f"Time to write: {time.time() - t}s")
+            f.write(content)
         text = extract_word(tempf, file_extension)
 
     return text
@@ -79,16 +110,11 @@ def process_word(file: str, file_extension: str) -> str:
 def extract_word(filepath: str, ext: str) -> str:
     "Try to extract a word document, with handling for RTFs."
     try:
-        t = time.time()
-        text = textract.process(filepath, extension=ext).decode("utf-8")
-        logger.debug(f"Time to extract: {time.time() - t}s")
-        return text
+        return textract.process(filepath, extension=ext).decode("utf-8")
     except textract.exceptions.ShellError:
         try:
-            t = time.time()
-            text = textract.process(filepath, extension="rtf").decode("utf-8")
-            logger.debug(f"Time to extract: {time.time() - t}s")
-            return text
+            with metrics.timed("extract_rtf"):
+                return textract.process(filepath, extension="rtf").decode("utf-8")
         except Exception as err:
             logging.error(err)
             raise HTTPException(status.HTTP_400_BAD_REQUEST, "Could not read document.")
@@ -97,65 +123,107 @@ def extract_word(filepath: str, ext: str) -> str:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "Could not read document.")
 
 
-def process_pdf(file: str, file_extension: str) -> str:
-    """Call the GCP Cloud Vision API to extract text from a PDF document."""
+def process_pdf(content: bytes, file_extension: str) -> str:
+    """Extract the text layer of a PDF document, or OCR it if it has none.
+
+    Only the first PDF_MAX_PAGES pages are read, and reading stops once
+    PDF_MAX_TEXT characters have been extracted. Pages are extracted one at a
+    time and released as they go, or by a pool of processes for documents of
+    PDF_PARALLEL_PAGES pages or more.
+
+    Raises:
+        HTTPException: HTTP 413 if the file is larger than PDF_MAX_BYTES, or
+            HTTP 400 if it is not a valid PDF.
+    """
     logging.debug("Processing as a PDF")
 
-    t = time.time()
-    content = b64decode(file)
-    with io.BytesIO(content) as b:
+    if PDF_MAX_BYTES and len(content) > PDF_MAX_BYTES:
+        raise HTTPException(
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            f"PDF files are limited to {PDF_MAX_BYTES // 2**20} MB.",
+        )
+
+    with metrics.timed("extract_pdf"):
         try:
-            pdf = fitz.open(filename="x.pdf", stream=b)
+            pdf = fitz.open(stream=content, filetype="pdf")
         except RuntimeError:
             raise HTTPException(status.HTTP_400_BAD_REQUEST, "Invalid PDF file")
-        page_count = pdf.page_count
-        logger.debug(page_count)
-        logger.debug(f"Time to get page count: {time.time() - t}s")
-
-        # Attempt direct extraction
-        full_text = "\n".join([page.getText() for page in pdf])
+        try:
+            page_count = pdf.page_count
+            logger.debug("PDF has %d pages", page_count)
+            if PDF_MAX_PAGES and page_count > PDF_MAX_PAGES:
+                logger.warning(
+                    "Reading %d of the %d pages of a PDF", PDF_MAX_PAGES, page_count
+                )
+                page_count = PDF_MAX_PAGES
+
+            # Attempt direct extraction
+            if 0 < pdf_pages.PDF_PARALLEL_PAGES <= page_count:
+                pages = iter_parallel_text(content, page_count)
+                with metrics.timed("extract_pdf_parallel"), contextlib.closing(pages):
+                    full_text = "\n".join(limit_text(pages))
+            else:
+                full_text = "\n".join(limit_text(iter_page_text(pdf, page_count)))
+        finally:
+            pdf.close()
 
         if len(full_text.strip()) > 0:
+            metrics.PAGES.labels("text").observe(page_count)
             return full_text
 
-    client = vision.ImageAnnotatorClient()
-    tasks = asyncio.gather(
-        *[
-            sync_detect_document(content, batch, client=client)
-            for batch in utils.batch_pages(page_count)
-        ]
-    )
-    results = loop.run_until_complete(tasks)
-    full_text = " ".join(
-        [
-            y["fullTextAnnotation"]["text"]
-            for b in results
-            for x in json.loads(proto.Message.to_json(b))["responses"]
-            for y in x["responses"]
-        ]
-    )
-    return full_text
+    metrics.PAGES.labels("ocr").observe(page_count)
+    backend = ocr.get_backend()
+    with metrics.timed("ocr"):
+        return " ".join(limit_text(backend.iter_pages(content, page_count)))
 
 
-async def sync_detect_document(content, page_batch: List[int], client=None):
-    """Synchronous call to Vision API.
+def iter_page_text(pdf: fitz.Document, page_count: int) -> Iterator[str]:
+    """Yield the text layer of the first page_count pages, one at a time."""
+    for number in range(page_count):
+        yield pdf[number].getText()
 
-    Args:
-        content: Byte stream of the file.
-        page_batch (List[int]): A list of page numbers to detect on
-            e.g. [1,2,3,4,5]. Max len = 5.
-        client: The Vision API ImageAnnotatorClient
 
-    Returns:
-        BatchAnnotateFilesResponse
+def iter_parallel_text(content: bytes, page_count: int) -> Iterator[str]:
+    """Yield the text layer of the first page_count pages, extracted by the pool.
+
+    The document is written once to shared memory, and each process of the
+    pdf_pages pool opens it and extracts a range of pages. Ranges are read in
+    page order within the request deadline, and the ones left when the caller
+    stops reading are cancelled.
     """
-    if not client:
-        client = vision.ImageAnnotatorClient()
-
-    mime_type = "application/pdf"
-    input_config = {"mime_type": mime_type, "content": content}
-    features = [{"type_": vision.Feature.Type.DOCUMENT_TEXT_DETECTION}]
-    request = [
-        {"input_config": input_config, "features": features, "pages": page_batch}
-    ]
-    return client.batch_annotate_files(requests=request)
+    with pdf_pages.shared_copy(content) as path:
+        ranges = pdf_pages.page_ranges(
+            page_count,
+            pdf_pages.PDF_PARALLEL_WORKERS,
+            pdf_pages.PDF_PARALLEL_MIN_RANGE,
+        )
+        pool = pdf_pages.get_pool()
+        futures = [
+            pool.submit(pdf_pages.extract_range, path, r.start, r.stop) for r in ranges
+        ]
+        try:
+            for future in futures:
+                deadline.check("extract_pdf_parallel")
+                try:
+                    texts = future.result(timeout=deadline.remaining())
+                except concurrent.futures.TimeoutError:
+                    raise HTTPException(
+                        status.HTTP_504_GATEWAY_TIMEOUT,
+                        "Deadline exceeded during PDF extraction.",
+                    )
+                yield from texts
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def limit_text(texts: Iterable[str], max_text: int = None) -> Iterator[str]:
+    """Pass page texts through until max_text characters have been read."""
+    max_text = PDF_MAX_TEXT if max_text is None else max_text
+    size = 0
+    for text in texts:
+        yield text
+        size += len(text)
+        if max_text and size >= max_text:
+            logger.warning("Stopped reading a PDF after %d characters", size)
+            return
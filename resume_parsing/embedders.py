@@ -0,0 +1,134 @@
+import abc
+import logging
+import os
+import pathlib
+import re
+import zlib
+from collections import Counter
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger()
+logger.setLevel(level=logging.INFO)
+
+MODEL_PATH = (
+    os.environ.get("TFHUB_CACHE_DIR")
+    or "https://tfhub.dev/google/universal-sentence-encoder/4"  # noqa: W503
+)
+ONET_EMBEDDER = os.getenv("ONET_EMBEDDER", "hashing")
+
+
+class Embedder(abc.ABC):
+    """Maps a list of texts to a 2D array of embeddings, one row per text."""
+
+    name = "embedder"
+
+    @abc.abstractmethod
+    def __call__(self, texts: List[str]) -> np.ndarray:
+        """The embeddings of texts, one row per text."""
+
+    def fit(self, texts: List[str]):
+        """Learn corpus statistics. A no-op for pretrained models."""
+        return self
+
+    def save(self, path: pathlib.Path):
+        """Save learned state next to an index. A no-op for pretrained models."""
+
+
+class UniversalSentenceEncoder(Embedder):
+    """Universal Sentence Encoder from TF Hub."""
+
+    def __init__(self, model_path: str = MODEL_PATH):
+        import tensorflow_hub as hub
+
+        self.name = f"use:{model_path}"
+        self.model = hub.load(model_path)
+
+    def __call__(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self.model(texts), dtype=np.float32)
+
+
+class HashingEmbedder(Embedder):
+    """Character n-gram TF-IDF features hashed into a fixed number of columns.
+
+    Runs locally on the CPU with no model download. The IDF weights are fit
+    on the O*NET corpus when the index is built and saved alongside it.
+    """
+
+    IDF_FILE = "hashing_idf.npy"
+
+    def __init__(self, dims: int = 4096, ngrams=(3, 5), idf: np.ndarray = None):
+        self.dims = dims
+        self.ngrams = tuple(ngrams)
+        self.idf = idf
+        self.name = f"hashing:{dims}:{self.ngrams[0]}-{self.ngrams[1]}"
+
+    def _features(self, text: str) -> Counter:
+        counts = Counter()
+        for word in re.findall(r"\w+", text.lower()):
+            word = f" {word} "
+            for n in range(self.ngrams[0], self.ngrams[1] + 1):
+                for i in range(max(1, len(word) - n + 1)):
+                    counts[zlib.crc32(word[i : i + n].encode("utf-8"))] += 1
+        return counts
+
+    def _counts(self, texts: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dims), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for h, count in self._features(text).items():
+                matrix[row, h % self.dims] += count
+        return matrix
+
+    def fit(self, texts: List[str]):
+        df = (self._counts(texts) > 0).sum(axis=0)
+        self.idf = (np.log((1 + len(texts)) / (1 + df)) + 1).astype(np.float32)
+        return self
+
+    def __call__(self, texts: List[str]) -> np.ndarray:
+        matrix = self._counts(texts)
+        np.log1p(matrix, out=matrix)
+        if self.idf is not None:
+            matrix *= self.idf
+        return matrix
+
+    def save(self, path: pathlib.Path):
+        if self.idf is not None:
+            np.save(pathlib.Path(path) / self.IDF_FILE, self.idf)
+
+    @classmethod
+    def from_name(cls, name: str, path: Optional[pathlib.Path] = None):
+        _, dims, ngrams = name.split(":")
+        lo, hi = ngrams.split("-")
+        idf = None
+        if path is not None and (pathlib.Path(path) / cls.IDF_FILE).exists():
+            idf = np.load(pathlib.Path(path) / cls.IDF_FILE)
+        return cls(dims=int(dims), ngrams=(int(lo), int(hi)), idf=idf)
+
+
+def fork_safe(name: str) -> bool:
+    """Whether the named embedder can be built before a fork and shared."""
+    return name.startswith("hashing")
+
+
+def get_embedder(name: str = ONET_EMBEDDER, path: pathlib.Path = None) -> Embedder:
+    """Construct an embedder by name.
+
+    Args:
+        name (str): "hashing" or "use" for a new embedder, or the full name
+            recorded in an index manifest, e.g. "hashing:4096:3-5".
+        path (pathlib.Path): Index directory holding learned state.
+
+    Returns:
+        Embedder: The embedder.
+    """
+    if name == "hashing":
+        return HashingEmbedder()
+    if name.startswith("hashing:"):
+        return HashingEmbedder.from_name(name, path)
+    if name == "use":
+        return UniversalSentenceEncoder()
+    if name.startswith("use:"):
+        return UniversalSentenceEncoder(name[len("use:") :])
+    # Indexes built before embedders were named store the TF Hub model path
+    return UniversalSentenceEncoder(name)
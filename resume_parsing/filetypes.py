@@ -0,0 +1,62 @@
+from typing import Optional
+
+PDF = "pdf"
+DOCX = "docx"
+DOC = "doc"
+RTF = "rtf"
+TEXT = "text"
+
+OLE2_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+ZIP_MAGIC = b"PK\x03\x04"
+# Readers accept a PDF header anywhere in the first KB
+PDF_HEADER_WINDOW = 1024
+TEXT_SAMPLE = 4096
+# Share of control characters, other than whitespace, allowed in plain text
+TEXT_MAX_CONTROL = 0.01
+
+
+def sniff(content: bytes) -> Optional[str]:
+    """The type of a document from its content, whatever its extension.
+
+    Args:
+        content (bytes): The decoded file.
+
+    Returns:
+        str: One of PDF, DOCX (any zip, as Office Open XML documents are),
+            DOC (an OLE2 compound file), RTF or TEXT, or None if unknown.
+    """
+    if content.startswith(ZIP_MAGIC):
+        return DOCX
+    if content.startswith(OLE2_MAGIC):
+        return DOC
+    if content.lstrip()[:5] == b"{\\rtf":
+        return RTF
+    if b"%PDF-" in content[:PDF_HEADER_WINDOW]:
+        return PDF
+    if content and is_text(content[:TEXT_SAMPLE]):
+        return TEXT
+    return None
+
+
+def is_text(sample: bytes) -> bool:
+    """Whether a sample of a file looks like UTF-8 or Windows-1252 text."""
+    if b"\x00" in sample:
+        return False
+    try:
+        text = sample.decode("utf-8")
+    except UnicodeDecodeError as err:
+        # The sample may end in the middle of a character
+        if err.start >= len(sample) - 3:
+            text = sample[: err.start].decode("utf-8")
+        else:
+            text = sample.decode("cp1252", errors="replace")
+    control = sum(1 for c in text if ord(c) < 32 and c not in "\t\n\r\f")
+    return control <= TEXT_MAX_CONTROL * len(text)
+
+
+def decode_text(content: bytes) -> str:
+    """Plain text as UTF-8, or Windows-1252 if it isn't valid UTF-8."""
+    try:
+        return content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return content.decode("cp1252", errors="replace")
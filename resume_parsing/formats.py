@@ -0,0 +1,87 @@
+import json
+from typing import Optional
+
+from fastapi import HTTPException, Response, status
+from fastapi.responses import StreamingResponse
+
+from resume_parsing import metrics
+from resume_parsing.utils import stream_xml
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Media types for the ResumeData structure. Plain application/json keeps the
+# historical {"xml": ...} envelope so existing clients are unaffected.
+ENVELOPE = "application/json"
+XML = "application/xml"
+JSON = "application/vnd.resumedata+json"
+MSGPACK = "application/msgpack"
+
+ALIASES = {
+    "*/*": ENVELOPE,
+    "application/*": ENVELOPE,
+    ENVELOPE: ENVELOPE,
+    XML: XML,
+    "text/xml": XML,
+    JSON: JSON,
+    MSGPACK: MSGPACK,
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+}
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """Pick the response media type from an Accept header.
+
+    Args:
+        accept (str): The Accept header, if any.
+
+    Raises:
+        HTTPException: HTTP 406 if MessagePack is requested but unavailable.
+
+    Returns:
+        str: One of ENVELOPE, XML, JSON or MSGPACK.
+    """
+    if not accept:
+        return ENVELOPE
+
+    best, best_q = None, 0.0
+    for item in accept.split(","):
+        media_type, *params = [p.strip() for p in item.split(";")]
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        supported = ALIASES.get(media_type.lower())
+        if supported and q > best_q:
+            best, best_q = supported, q
+
+    if best is None:
+        # Unknown types get the default rather than a 406, as before
+        return ENVELOPE
+    if best == MSGPACK and msgpack is None:
+        raise HTTPException(
+            status.HTTP_406_NOT_ACCEPTABLE, "MessagePack output is not available."
+        )
+    return best
+
+
+def render(results: dict, media_type: str) -> Response:
+    """Serialize the parsed results without going through the XML envelope."""
+    if media_type == XML:
+        return StreamingResponse(stream_xml(results), media_type=XML)
+    if media_type == JSON:
+        with metrics.timed("to_json"):
+            body = json.dumps(results, default=str, separators=(",", ":"))
+        return Response(body, media_type=JSON)
+    if media_type == MSGPACK:
+        with metrics.timed("to_msgpack"):
+            body = msgpack.packb(results, default=str)
+        return Response(body, media_type=MSGPACK)
+    raise ValueError(f"No renderer for [{media_type}]")
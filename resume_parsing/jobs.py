@@ -0,0 +1,342 @@
+import abc
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+from typing import NamedTuple, Optional
+
+from fastapi import HTTPException, status
+
+from resume_parsing import deadline, metrics, pipeline
+from resume_parsing.utils import to_xml
+
+logger = logging.getLogger()
+logger.setLevel(level=logging.INFO)
+
+JOB_BACKEND = os.getenv("JOB_BACKEND", "sqlite")
+# The SQLite store is local to the container. With more than one instance,
+# polls must reach the instance that took the job, e.g. with session
+# affinity, until the store is shared.
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", "/tmp/resume_parsing_jobs.db")
+# Job threads per gunicorn worker. 0 accepts jobs without processing them,
+# e.g. when a separate pool drains the queue.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# A job whose worker has not finished it within the lease is handed out again.
+# Jobs run under a deadline this margin shorter, as the deadline is only
+# checked between stages and by the remote calls.
+JOB_LEASE = float(os.getenv("JOB_LEASE", "600"))
+JOB_LEASE_MARGIN = float(os.getenv("JOB_LEASE_MARGIN", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", str(24 * 3600)))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.5"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class Job(NamedTuple):
+    id: str
+    file: str
+    file_extension: str
+    attempts: int
+    # Identifies the claim: outcomes are only recorded while it holds
+    lease_until: float
+
+
+class JobStore(abc.ABC):
+    """A durable queue of resumes to parse, and the store of their results."""
+
+    @abc.abstractmethod
+    def submit(self, file: str, file_extension: str) -> str:
+        """Queue a base64-encoded resume and return its job ID."""
+
+    @abc.abstractmethod
+    def claim(self, lease: float, max_attempts: int) -> Optional[Job]:
+        """Take the oldest available job for lease seconds, if there is one.
+
+        A job whose lease ran out after max_attempts attempts failed instead,
+        as its worker keeps dying or hanging on it.
+        """
+
+    @abc.abstractmethod
+    def complete(self, job: Job, xml: str) -> bool:
+        """Store the result of a claimed job.
+
+        This, fail and retry return False, and change nothing, if the claim
+        was lost, i.e. the lease ran out and the job was claimed again.
+        """
+
+    @abc.abstractmethod
+    def fail(self, job: Job, status_code: int, detail: str) -> bool:
+        """Store the error of a claimed job, which is not retried."""
+
+    @abc.abstractmethod
+    def retry(self, job: Job, delay: float, count_attempt: bool = True) -> bool:
+        """Put a claimed job back in the queue after delay seconds."""
+
+    @abc.abstractmethod
+    def get(self, job_id: str) -> Optional[dict]:
+        """The status of a job, with its result or error once it has one."""
+
+    @abc.abstractmethod
+    def purge(self, older_than: float):
+        """Delete finished jobs older than older_than seconds."""
+
+
+class SQLiteJobStore(JobStore):
+    """Job store in a local SQLite database, shared by the workers on a host."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._db() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT, file TEXT, file_extension TEXT, "
+                "submitted REAL, available_at REAL, lease_until REAL, "
+                "finished REAL, attempts INTEGER DEFAULT 0, result TEXT, "
+                "error_status INTEGER, error TEXT)"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_queue "
+                "ON jobs (status, available_at, submitted)"
+            )
+
+    def _db(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared between threads, or across fork
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    def submit(self, file: str, file_extension: str) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._db().execute(
+            "INSERT INTO jobs (id, status, file, file_extension, submitted, "
+            "available_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, QUEUED, file, file_extension, now, now),
+        )
+        return job_id
+
+    def claim(self, lease: float, max_attempts: int) -> Optional[Job]:
+        db = self._db()
+        now = time.time()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            abandoned = db.execute(
+                "UPDATE jobs SET status = ?, error_status = ?, error = ?, "
+                "file = NULL, finished = ? "
+                "WHERE status = ? AND lease_until < ? AND attempts >= ?",
+                (
+                    FAILED,
+                    status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    "The job did not finish within its lease in any attempt.",
+                    now,
+                    RUNNING,
+                    now,
+                    max_attempts,
+                ),
+            ).rowcount
+            row = db.execute(
+                "SELECT id, file, file_extension, attempts FROM jobs "
+                "WHERE (status = ? AND available_at <= ?) "
+                "OR (status = ? AND lease_until < ?) "
+                "ORDER BY submitted LIMIT 1",
+                (QUEUED, now, RUNNING, now),
+            ).fetchone()
+            if row is not None:
+                db.execute(
+                    "UPDATE jobs SET status = ?, lease_until = ?, "
+                    "attempts = attempts + 1 WHERE id = ?",
+                    (RUNNING, now + lease, row[0]),
+                )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        if abandoned:
+            metrics.JOBS.labels("failed").inc(abandoned)
+            logger.error("Failed %d jobs out of attempts past their lease", abandoned)
+        if row is None:
+            return None
+        return Job(
+            id=row[0],
+            file=row[1],
+            file_extension=row[2],
+            attempts=row[3] + 1,
+            lease_until=now + lease,
+        )
+
+    def _update_claimed(self, job: Job, assignments: str, values: tuple) -> bool:
+        cursor = self._db().execute(
+            f"UPDATE jobs SET {assignments} "
+            "WHERE id = ? AND status = ? AND lease_until = ?",
+            (*values, job.id, RUNNING, job.lease_until),
+        )
+        return cursor.rowcount > 0
+
+    def complete(self, job: Job, xml: str) -> bool:
+        return self._update_claimed(
+            job,
+            "status = ?, result = ?, file = NULL, finished = ?",
+            (DONE, xml, time.time()),
+        )
+
+    def fail(self, job: Job, status_code: int, detail: str) -> bool:
+        return self._update_claimed(
+            job,
+            "status = ?, error_status = ?, error = ?, file = NULL, finished = ?",
+            (FAILED, status_code, detail, time.time()),
+        )
+
+    def retry(self, job: Job, delay: float, count_attempt: bool = True) -> bool:
+        return self._update_claimed(
+            job,
+            "status = ?, available_at = ?, attempts = attempts - ?",
+            (QUEUED, time.time() + delay, 0 if count_attempt else 1),
+        )
+
+    def get(self, job_id: str) -> Optional[dict]:
+        row = (
+            self._db()
+            .execute(
+                "SELECT status, result, error_status, error FROM jobs WHERE id = ?",
+                (job_id,),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        job = {"id": job_id, "status": row[0]}
+        if row[0] == DONE:
+            job["xml"] = row[1]
+        elif row[0] == FAILED:
+            job["error"] = {"status": row[2], "detail": row[3]}
+        return job
+
+    def purge(self, older_than: float):
+        self._db().execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND finished < ?",
+            (DONE, FAILED, time.time() - older_than),
+        )
+
+
+JOB_BACKENDS = {"sqlite": lambda: SQLiteJobStore(JOB_STORE_PATH)}
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> JobStore:
+    """The job store of this process, chosen by JOB_BACKEND."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = JOB_BACKENDS[JOB_BACKEND]()
+        return _store
+
+
+class JobRunner:
+    """Threads that drain the job queue through the pipeline.
+
+    Jobs rejected by admission control go back in the queue without using up
+    an attempt. Other failures are retried with backoff up to
+    JOB_MAX_ATTEMPTS times, except HTTP errors about the document itself. The
+    outcome of a job whose lease ran out is dropped, as another worker owns
+    the job by then.
+    """
+
+    def __init__(self, store: JobStore, app, workers: int = JOB_WORKERS):
+        self.store = store
+        # Stands in for the request the pipeline reads app state from
+        self.request = SimpleNamespace(app=app, headers={})
+        self.workers = workers
+        self._threads = []
+        self._stopping = threading.Event()
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._loop, name=f"jobs-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5):
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _loop(self):
+        last_purge = 0.0
+        while not self._stopping.is_set():
+            try:
+                if time.monotonic() - last_purge > 3600:
+                    self.store.purge(JOB_RETENTION)
+                    last_purge = time.monotonic()
+                job = self.store.claim(JOB_LEASE, JOB_MAX_ATTEMPTS)
+            except sqlite3.Error as err:
+                logger.error("Failed to claim a job: %s", err)
+                job = None
+            if job is None:
+                self._stopping.wait(JOB_POLL_INTERVAL)
+                continue
+            try:
+                self.run(job)
+            except sqlite3.Error as err:
+                # The job stays claimed, and is taken again once its lease ends
+                logger.error(
+                    "Failed to record the outcome of job [%s]: %s", job.id, err
+                )
+
+    def run(self, job: Job):
+        try:
+            # Give up before the lease runs out and another worker takes over
+            timeout = JOB_LEASE - min(JOB_LEASE_MARGIN, JOB_LEASE / 2)
+            with deadline.limit(timeout), metrics.timed("job"):
+                results = pipeline.process(
+                    job.file, job.file_extension, request=self.request
+                )
+                xml = to_xml(results)
+        except HTTPException as err:
+            if err.status_code in (
+                status.HTTP_429_TOO_MANY_REQUESTS,
+                status.HTTP_503_SERVICE_UNAVAILABLE,
+            ):
+                delay = float((err.headers or {}).get("Retry-After", JOB_POLL_INTERVAL))
+                recorded = self.store.retry(job, delay, count_attempt=False)
+                self._count(job, "deferred", recorded)
+            elif err.status_code >= 500 and job.attempts < JOB_MAX_ATTEMPTS:
+                recorded = self.store.retry(job, 2**job.attempts)
+                self._count(job, "retried", recorded)
+            else:
+                recorded = self.store.fail(job, err.status_code, str(err.detail))
+                self._count(job, "failed", recorded)
+        except Exception as err:
+            logger.exception("Job [%s] failed", job.id)
+            if job.attempts < JOB_MAX_ATTEMPTS:
+                recorded = self.store.retry(job, 2**job.attempts)
+                self._count(job, "retried", recorded)
+            else:
+                recorded = self.store.fail(
+                    job, status.HTTP_500_INTERNAL_SERVER_ERROR, str(err)
+                )
+                self._count(job, "failed", recorded)
+        else:
+            self._count(job, "done", self.store.complete(job, xml))
+
+    def _count(self, job: Job, outcome: str, recorded: bool):
+        if recorded:
+            metrics.JOBS.labels(outcome).inc()
+        else:
+            metrics.JOBS.labels("superseded").inc()
+            logger.warning(
+                "Dropped the outcome of job [%s], claimed again after its lease",
+                job.id,
+            )
@@ -1,21 +1,26 @@
 import logging
 import os
+from typing import Optional
 
 import uvicorn
 from fastapi import Depends, FastAPI, HTTPException, Request, Response, status
 from fastapi.security import HTTPBearer
-from gcsfs import GCSFileSystem
 
 # from jose import JWTError, jwt
 from pydantic import BaseModel
 
-from resume_parsing import (
-    custom_parser,
-    doc_extractor,
+from resume_parsing import (  # noqa: F401
+    deadline,
+    formats,
+    jobs,
+    memory,
+    metrics,
     onet_similarity,
-)  # , ner_trigger
-from resume_parsing import ner_trigger_patch as ner_trigger
-import onet_similarity_patch as onet_similarity
+    pdf_pages,
+    pipeline,
+    profiler,
+    shadow,
+)
 from resume_parsing.utils import to_xml
 from utils import to_xml
 
@@ -24,14 +29,18 @@ app = FastAPI()
 logger = logging.getLogger()
 logger.setLevel(level=logging.INFO)
 
-fs = GCSFileSystem(timeout=1)
-
 # bearer = HTTPBearer()
 # SECRET_KEY = os.getenv("JCW_APP")
 # ALGORITHM = "HS256"
 
 STAGING_PATH = os.getenv("STAGING_PATH", "gs://wi_test_bucket/tests")
 ENDPOINT_NAME = os.getenv("ENDPOINT_NAME", "resume_parsing_qa_09_03_2021")
+PRELOAD_APP = os.getenv("PRELOAD_APP", "false").lower() in ("1", "true", "yes")
+
+if PRELOAD_APP:
+    # With gunicorn's preload_app this runs once in the master, and the
+    # workers forked from it share the state copy-on-write
+    pipeline.preload()
 
 
 class ResumeFile(BaseModel):
@@ -56,16 +65,79 @@ class ParsedFields(BaseModel):
         }
 
 
+class JobStatus(BaseModel):
+    id: str
+    status: str
+    xml: Optional[str] = None
+    error: Optional[dict] = None
+
+
 @app.get("/api/resumes/healthcheck")
 async def health():
     return Response(status_code=200)
 
 
-# @app.on_event("startup")
-# async def app_startup():
-#     app.state.endpoint_name = ENDPOINT_NAME
-#     app.state.onet = onet_similarity.get_onet()
-#     app.state.embed = onet_similarity.get_embed()
+@app.get("/api/resumes/metrics")
+def metrics_endpoint():
+    """Per-stage latency histograms and counters in the Prometheus format."""
+    body, content_type = metrics.export()
+    return Response(body, media_type=content_type)
+
+
+@app.get("/api/resumes/admin/profiles")
+def list_profiles():
+    """Recent request profiles, newest first."""
+    return {"profiles": profiler.list_profiles()}
+
+
+@app.get("/api/resumes/admin/profiles/{profile_id}")
+def get_profile(profile_id: str):
+    """A request profile as folded stacks, for flamegraph.pl or speedscope."""
+    folded = profiler.load_profile(profile_id)
+    if folded is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Profile not found.")
+    return Response(folded, media_type="text/plain")
+
+
+@app.get("/api/resumes/admin/memory")
+def memory_report(limit: int = 20, group_by: str = "lineno"):
+    """Top allocation sites of the worker serving this, and per-stage growth.
+
+    Needs TRACEMALLOC_FRAMES; without it only the RSS is reported.
+    """
+    if group_by not in memory.GROUP_BY:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            f"group_by must be one of {', '.join(memory.GROUP_BY)}.",
+        )
+    return memory.report(limit, group_by)
+
+
+@app.post("/api/resumes/admin/memory/baseline")
+def reset_memory_baseline():
+    """Report growth from now on, e.g. after warming the worker up."""
+    memory.reset_baseline()
+    return Response(status_code=204)
+
+
+@app.on_event("startup")
+async def app_startup():
+    app.state.endpoint_name = ENDPOINT_NAME
+    if onet_similarity.ONET_INDEX_PATH:
+        app.state.onet_index = onet_similarity.get_index()
+        app.state.embed = onet_similarity.get_embed()
+    if jobs.JOB_WORKERS > 0:
+        app.state.job_runner = jobs.JobRunner(jobs.get_store(), app)
+        app.state.job_runner.start()
+    memory.reset_baseline()
+
+
+@app.on_event("shutdown")
+async def app_shutdown():
+    if getattr(app.state, "job_runner", None):
+        app.state.job_runner.stop()
+    pdf_pages.shutdown()
+    shadow.shutdown()
 
 
 # async def authenticate(token: str = Depends(bearer)):  # noqa: B008
@@ -87,32 +159,88 @@ async def health():
     response_model=ParsedFields,
     # dependencies=[Depends(authenticate)],
 )
-def root(file: ResumeFile, request: Request):
+def root(file: ResumeFile, request: Request, response: Response):
     """Extracts a resume document for text processing.
 
     .doc/.docx files are extracted using Textract
     .pdf files are extracted using Google's Cloud Vision API
 
-    A message is added to a downstream Pub/Sub topic with the request_id
-    to wait for completion.
+    Large resumes can instead be submitted to /api/resumes/jobs, which
+    returns right away, and their results polled for.
 
     Args:
         file (str): A base64-encoded string containing the file.
         fileExtension (str): The file extension of the resume. Expected to be one of:
             .pdf, .doc, .docx
 
+    The response format follows the Accept header. XML wrapped in JSON is
+    the default; application/xml returns the bare XML document, and
+    application/vnd.resumedata+json or application/msgpack return the
+    ResumeData structure directly.
+
+    When profiling is enabled, a request with an X-Profile header is
+    profiled, and the ID of its profile is returned in X-Profile-Id.
+
+    Work stops with HTTP 504 after REQUEST_TIMEOUT seconds, or sooner if the
+    client sends its own timeout in X-Request-Timeout. A busy worker rejects
+    resumes with HTTP 429 or 503 and a Retry-After header.
+
     Returns:
         ExtractionRequest:
             xml: An XML element containing the parsed fields
     """
-    text = doc_extractor.process_by_filetype(file.file, file.fileExtension)
-    entities = ner_trigger.predict_entities(text, request=request)
-    # entities = ner_trigger.predict_entities(text, request=request)
-    parsed_results = custom_parser.parse(entities, text)
-    final_results = onet_similarity.recommend_onet(
-        parsed_results, request=request
-    )  # add placeholder dictionary key
-    return {"xml": to_xml(final_results)}
+    media_type = formats.negotiate(request.headers.get("accept"))
+    timeout = deadline.request_timeout(request.headers.get(deadline.TIMEOUT_HEADER))
+    with deadline.limit(timeout), profiler.profiled(request) as profile_id:
+        with metrics.timed("request"):
+            final_results = pipeline.process(
+                file.file, file.fileExtension, request=request
+            )
+        if media_type != formats.ENVELOPE:
+            result = response = formats.render(final_results, media_type)
+        else:
+            with metrics.timed("to_xml"):
+                result = {"xml": to_xml(final_results)}
+    if profile_id:
+        response.headers["X-Profile-Id"] = profile_id
+    return result
+
+
+@app.post(
+    "/api/resumes/jobs",
+    response_model=JobStatus,
+    status_code=status.HTTP_202_ACCEPTED,
+    # dependencies=[Depends(authenticate)],
+)
+def submit_job(file: ResumeFile, response: Response):
+    """Queues a resume to be parsed in the background.
+
+    Jobs are kept by the instance that took them, see jobs.JOB_STORE_PATH.
+
+    Args:
+        file (str): A base64-encoded string containing the file.
+        fileExtension (str): The file extension of the resume.
+
+    Returns:
+        JobStatus: The job ID to poll /api/resumes/jobs/{id} with.
+    """
+    job_id = jobs.get_store().submit(file.file, file.fileExtension)
+    response.headers["Location"] = f"/api/resumes/jobs/{job_id}"
+    return {"id": job_id, "status": jobs.QUEUED}
+
+
+@app.get("/api/resumes/jobs/{job_id}", response_model=JobStatus)
+def get_job(job_id: str):
+    """The status of a job: queued, running, done or failed.
+
+    Returns:
+        JobStatus: With the XML once done, or the HTTP status and detail the
+            resume was rejected with once failed.
+    """
+    job = jobs.get_store().get(job_id)
+    if job is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Job not found.")
+    return job
 
 
 if __name__ == "__main__":
@@ -0,0 +1,119 @@
+import contextlib
+import os
+import threading
+import tracemalloc
+from typing import List, Optional
+
+# Allocation tracing is off unless TRACEMALLOC_FRAMES is set, to the number of
+# frames kept per allocation. Tracing slows allocations down and costs memory
+# of its own, so turn it on only while investigating.
+TRACEMALLOC_FRAMES = int(os.getenv("TRACEMALLOC_FRAMES", "0"))
+
+GROUP_BY = ("lineno", "filename", "traceback")
+# Allocations of the tracer and the import machinery are not the app's
+IGNORED_FILES = ("<frozen importlib._bootstrap*>", "<unknown>", tracemalloc.__file__)
+
+_lock = threading.Lock()
+_stages = {}
+_baseline = None
+
+if TRACEMALLOC_FRAMES > 0 and not tracemalloc.is_tracing():
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+
+
+@contextlib.contextmanager
+def tracked(stage: str):
+    """Add the memory a block leaves allocated to its stage's total.
+
+    The delta is of the whole process, so with concurrent requests in a worker
+    it includes what other threads allocated meanwhile; over many calls the
+    stages that keep growing still stand out.
+    """
+    if not tracemalloc.is_tracing():
+        yield
+        return
+    before = tracemalloc.get_traced_memory()[0]
+    try:
+        yield
+    finally:
+        delta = tracemalloc.get_traced_memory()[0] - before
+        with _lock:
+            calls, retained = _stages.get(stage, (0, 0))
+            _stages[stage] = (calls + 1, retained + delta)
+
+
+def reset_baseline():
+    """Compare later reports with the allocations as they are now."""
+    global _baseline
+    _baseline = _snapshot() if tracemalloc.is_tracing() else None
+    with _lock:
+        _stages.clear()
+
+
+def _snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, pattern) for pattern in IGNORED_FILES]
+    )
+
+
+def _site(stat) -> str:
+    return " <- ".join(f"{frame.filename}:{frame.lineno}" for frame in stat.traceback)
+
+
+def _rss() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def report(limit: int = 20, group_by: str = "lineno") -> dict:
+    """The top allocation sites of this process, and how they and the stages
+    grew since the baseline.
+
+    Args:
+        limit (int): Number of sites to list.
+        group_by (str): One of GROUP_BY. "traceback" keeps up to
+            TRACEMALLOC_FRAMES frames per site.
+
+    Returns:
+        dict: The report, with "tracing" False and no sites when tracing is off.
+    """
+    memory = {"pid": os.getpid(), "rss_bytes": _rss(), "tracing": False}
+    if not tracemalloc.is_tracing():
+        return memory
+    current, peak = tracemalloc.get_traced_memory()
+    snapshot = _snapshot()
+    memory.update(
+        tracing=True,
+        traced_bytes=current,
+        peak_traced_bytes=peak,
+        top=_top(snapshot.statistics(group_by), limit),
+    )
+    if _baseline is not None:
+        memory["growth"] = [
+            {
+                "site": _site(stat),
+                "size_diff": stat.size_diff,
+                "count_diff": stat.count_diff,
+            }
+            for stat in snapshot.compare_to(_baseline, group_by)[:limit]
+        ]
+    with _lock:
+        memory["stages"] = {
+            stage: {
+                "calls": calls,
+                "retained_bytes": retained,
+                "mean_retained_bytes": retained // calls,
+            }
+            for stage, (calls, retained) in sorted(_stages.items())
+        }
+    return memory
+
+
+def _top(stats: List, limit: int) -> List[dict]:
+    return [
+        {"site": _site(stat), "size": stat.size, "count": stat.count}
+        for stat in stats[:limit]
+    ]
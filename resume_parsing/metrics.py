@@ -0,0 +1,250 @@
+import contextlib
+import functools
+import os
+import threading
+import time
+from typing import Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    values,
+)
+
+from resume_parsing import memory
+
+# Under gunicorn every worker keeps its own metrics. With this set, samples
+# are written to files in the directory and /metrics aggregates all workers.
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR", "")
+# How often the RSS of the worker is sampled while resumes are processed
+PEAK_RSS_INTERVAL = float(os.getenv("PEAK_RSS_INTERVAL", "0.01"))
+
+# From 1ms up to the 300s gunicorn timeout
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+    300.0,
+)
+
+STAGE_SECONDS = Histogram(
+    "resume_parsing_stage_seconds",
+    "Time spent in each stage of the pipeline.",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+ERRORS = Counter("resume_parsing_errors", "Exceptions raised by each stage.", ["stage"])
+FILES = Counter("resume_parsing_files", "Documents received by type.", ["file_type"])
+PAGES = Histogram(
+    "resume_parsing_pdf_pages",
+    "Pages per PDF document.",
+    ["method"],
+    buckets=(1, 2, 3, 4, 5, 10, 20, 50, 100),
+)
+CACHE = Counter(
+    "resume_parsing_cache_lookups", "Cache lookups by outcome.", ["cache", "result"]
+)
+ADMISSIONS = Counter(
+    "resume_parsing_admissions", "Admission decisions by outcome.", ["result"]
+)
+COALESCED = Counter(
+    "resume_parsing_coalesced_calls",
+    "Calls that shared the result of an identical call already in progress.",
+    ["stage"],
+)
+PEAK_RSS = Histogram(
+    "resume_parsing_peak_rss_bytes",
+    "Peak resident memory of the worker while processing each resume.",
+    buckets=tuple(2**n * 2**20 for n in range(6, 14)),  # 64 MiB to 8 GiB
+)
+SHADOW = Counter(
+    "resume_parsing_shadow_parses",
+    "Sampled parses compared with the candidate parser, by outcome.",
+    ["result"],
+)
+JOBS = Counter("resume_parsing_jobs", "Asynchronous jobs run, by outcome.", ["result"])
+IN_FLIGHT_COST = Gauge(
+    "resume_parsing_in_flight_cost",
+    "Estimated cost of the requests being processed.",
+    multiprocess_mode="livesum",
+)
+
+
+@contextlib.contextmanager
+def timed(stage: str):
+    """Observe the duration of a block, and count it as an error if it raises.
+
+    With allocation tracing on, the memory the block leaves allocated is added
+    to the stage in the memory report too.
+    """
+    start = time.perf_counter()
+    try:
+        with memory.tracked(stage):
+            yield
+    except Exception:
+        ERRORS.labels(stage).inc()
+        raise
+    finally:
+        STAGE_SECONDS.labels(stage).observe(time.perf_counter() - start)
+
+
+def timer(stage: str):
+    """Decorator form of `timed`."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _rss() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+class _RssSampler(threading.Thread):
+    """Samples the RSS of the process while any block is being tracked.
+
+    One thread serves all the requests of a worker, each keeping the highest
+    sample seen while it ran, so concurrent requests don't reset each other's
+    peaks as clearing the kernel's high-water mark would.
+    """
+
+    def __init__(self, interval: float = PEAK_RSS_INTERVAL):
+        super().__init__(name="rss-sampler", daemon=True)
+        self.interval = interval
+        self._peaks = {}
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+
+    def track(self) -> object:
+        token = object()
+        rss = _rss()
+        with self._lock:
+            self._raise(rss)
+            self._peaks[token] = rss
+            self._active.set()
+        return token
+
+    def untrack(self, token: object) -> int:
+        rss = _rss()
+        with self._lock:
+            self._raise(rss)
+            peak = self._peaks.pop(token)
+            if not self._peaks:
+                self._active.clear()
+        return peak
+
+    def run(self):
+        while True:
+            self._active.wait()
+            rss = _rss()
+            with self._lock:
+                self._raise(rss)
+            time.sleep(self.interval)
+
+    def _raise(self, rss: int):
+        # Every sample counts towards all the blocks running when it was taken
+        for token, peak in self._peaks.items():
+            if rss > peak:
+                self._peaks[token] = rss
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    # The sampler thread belongs to the parent
+    global _sampler, _sampler_lock
+    _sampler = None
+    _sampler_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _get_sampler() -> _RssSampler:
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = _RssSampler()
+            _sampler.start()
+        return _sampler
+
+
+@contextlib.contextmanager
+def peak_rss():
+    """Observe the peak RSS of the process over a block, on Linux.
+
+    RSS is sampled every PEAK_RSS_INTERVAL seconds, so with concurrent
+    requests in a worker it is the peak of the worker while this one ran,
+    and spikes shorter than the interval may be missed.
+    """
+    try:
+        sampler = _get_sampler()
+        token = sampler.track()
+    except OSError:
+        yield
+        return
+    try:
+        yield
+    finally:
+        PEAK_RSS.observe(sampler.untrack(token))
+
+
+def count_cache(cache: str, hits: int, misses: int):
+    if hits:
+        CACHE.labels(cache, "hit").inc(hits)
+    if misses:
+        CACHE.labels(cache, "miss").inc(misses)
+
+
+def local_only():
+    """Keep the samples of this process out of PROMETHEUS_MULTIPROC_DIR.
+
+    For helper processes that run instrumented code, e.g. the shadow parser,
+    whose observations are not the workers'.
+    """
+    os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    values.ValueClass = values.MutexValue
+
+
+def mark_process_dead(pid: int):
+    """Drop the live gauges of a process that exited, if aggregating."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid, PROMETHEUS_MULTIPROC_DIR)
+
+
+def export() -> Tuple[bytes, str]:
+    """Metrics in the Prometheus text format, and their content type."""
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
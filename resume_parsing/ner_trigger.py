@@ -2,8 +2,11 @@ import logging
 import os
 
 from fastapi import HTTPException, status
+from google.api_core import exceptions as google_exceptions
 from google.cloud import aiplatform
 
+from resume_parsing import clients, deadline
+
 logger = logging.getLogger()
 logger.setLevel(level=logging.INFO)
 
@@ -53,10 +56,22 @@ def predict_entities(resume, request=None):
     #     logger.warning(f"Truncating resume from {len(resume)} to 10k characters")
     #     resume = resume[:9500]
 
-    endpoint = aiplatform.Endpoint(endpoint_id, project=PROJECT_ID, location=LOCATION)
+    endpoint = clients.get_endpoint(endpoint_id, PROJECT_ID, LOCATION)
+    deadline.check("ner")
 
+    instances = [{"content": resume}]
+    timeout = deadline.remaining()
     try:
-        response = endpoint.predict(instances=[{"content": resume}], parameters={})
+        if timeout is None:
+            response = endpoint.predict(instances=instances, parameters={})
+        else:
+            response = endpoint.predict(
+                instances=instances, parameters={}, timeout=timeout
+            )
+    except google_exceptions.DeadlineExceeded:
+        raise HTTPException(
+            status.HTTP_504_GATEWAY_TIMEOUT, "Deadline exceeded during NER."
+        )
     except Exception as err:
         logger.error(err)
         raise HTTPException(
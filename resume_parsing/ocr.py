@@ -0,0 +1,213 @@
+import abc
+import asyncio
+import concurrent.futures
+import logging
+import os
+import subprocess
+import threading
+from typing import Iterator, List
+
+import fitz
+from fastapi import HTTPException, status
+from google.api_core import exceptions as google_exceptions
+from google.cloud import vision
+
+from resume_parsing import clients, deadline, metrics, pdf_pages, utils
+
+logger = logging.getLogger()
+logger.setLevel(level=logging.INFO)
+
+# OCR engine for scanned PDFs: "vision" or "tesseract"
+OCR_BACKEND = os.getenv("OCR_BACKEND", "vision")
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+TESSERACT_CMD = os.getenv("TESSERACT_CMD", "tesseract")
+TESSERACT_LANG = os.getenv("TESSERACT_LANG", "eng")
+TESSERACT_TIMEOUT = float(os.getenv("TESSERACT_TIMEOUT", "60"))
+# Response fields to ask Vision for, as an x-goog-fieldmask. The words,
+# symbols and bounding boxes are most of a response and are not used, e.g.
+# responses.responses.fullTextAnnotation.text,responses.responses.context,
+# responses.responses.error. Empty asks for the full response.
+OCR_FIELD_MASK = os.getenv("OCR_FIELD_MASK", "")
+
+
+class OcrBackend(abc.ABC):
+    """Detects the text of the pages of an image-only PDF."""
+
+    name = None
+
+    @abc.abstractmethod
+    def iter_pages(self, content: bytes, page_count: int) -> Iterator[str]:
+        """Yield the text of the first page_count pages, in order.
+
+        Pages are detected lazily, so pages past the point where the caller
+        stops reading are not sent.
+        """
+
+
+class VisionOcrBackend(OcrBackend):
+    """Google Cloud Vision document text detection, five pages per call."""
+
+    name = "vision"
+
+    def iter_pages(self, content: bytes, page_count: int) -> Iterator[str]:
+        client = clients.get_vision_client()
+        for batch in utils.batch_pages(page_count):
+            response = asyncio.run(sync_detect_document(content, batch, client=client))
+            yield from page_texts(response, batch)
+
+
+def page_texts(response, page_batch: List[int]) -> List[str]:
+    """The text of each page of a batch, in the order of page_batch.
+
+    Reads the protobuf behind the response directly rather than converting
+    it to JSON, and places each page by its page number, whatever order the
+    responses come in, or by position when the field mask leaves the page
+    number out. Pages without text are empty.
+
+    Args:
+        response: The BatchAnnotateFilesResponse of the batch.
+        page_batch (List[int]): The page numbers the batch asked for.
+
+    Returns:
+        List[str]: The text of the pages.
+    """
+    texts = {}
+    pages = (
+        page
+        for file_response in vision.BatchAnnotateFilesResponse.pb(response).responses
+        for page in file_response.responses
+    )
+    for position, page in enumerate(pages):
+        # A field mask without the context leaves the page number unset, and
+        # responses then come in the order of the request
+        number = page.context.page_number or page_batch[position]
+        if page.error.code:
+            raise HTTPException(
+                status.HTTP_502_BAD_GATEWAY,
+                f"OCR failed on page {number}: {page.error.message}",
+            )
+        texts[number] = page.full_text_annotation.text
+    return [texts.get(number, "") for number in page_batch]
+
+
+async def sync_detect_document(content, page_batch: List[int], client=None):
+    """Synchronous call to Vision API.
+
+    Args:
+        content: Byte stream of the file.
+        page_batch (List[int]): A list of page numbers to detect on
+            e.g. [1,2,3,4,5]. Max len = 5.
+        client: The Vision API ImageAnnotatorClient
+
+    Returns:
+        BatchAnnotateFilesResponse
+    """
+    if not client:
+        client = clients.get_vision_client()
+
+    mime_type = "application/pdf"
+    input_config = {"mime_type": mime_type, "content": content}
+    features = [{"type_": vision.Feature.Type.DOCUMENT_TEXT_DETECTION}]
+    request = [
+        {"input_config": input_config, "features": features, "pages": page_batch}
+    ]
+    # Batches run one after another, so the ones left when the deadline
+    # passes are never sent
+    deadline.check("ocr_batch")
+    timeout = deadline.remaining()
+    options = {}
+    if OCR_FIELD_MASK:
+        options["metadata"] = [("x-goog-fieldmask", OCR_FIELD_MASK)]
+    with metrics.timed("ocr_batch"):
+        if timeout is None:
+            return client.batch_annotate_files(requests=request, **options)
+        try:
+            return client.batch_annotate_files(
+                requests=request, timeout=timeout, **options
+            )
+        except google_exceptions.DeadlineExceeded:
+            raise HTTPException(
+                status.HTTP_504_GATEWAY_TIMEOUT, "Deadline exceeded during OCR."
+            )
+
+
+def tesseract_page(path: str, number: int, dpi: int) -> str:
+    """Rasterize one page of the PDF at path and run Tesseract on it.
+
+    Runs in the pdf_pages pool. Tesseract reads the PNG from stdin and writes
+    the text to stdout, so nothing else touches the disk.
+    """
+    pdf = fitz.open(path)
+    try:
+        zoom = dpi / 72
+        png = pdf[number].get_pixmap(matrix=fitz.Matrix(zoom, zoom)).tobytes("png")
+    finally:
+        pdf.close()
+    result = subprocess.run(
+        [TESSERACT_CMD, "stdin", "stdout", "-l", TESSERACT_LANG, "--dpi", str(dpi)],
+        input=png,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        timeout=TESSERACT_TIMEOUT,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(
+            f"Tesseract failed on page {number + 1}: "
+            f"{result.stderr.decode('utf-8', 'replace').strip()}"
+        )
+    return result.stdout.decode("utf-8")
+
+
+class TesseractOcrBackend(OcrBackend):
+    """A local Tesseract, run on pages rasterized at OCR_DPI by the PDF pool.
+
+    Needs the tesseract binary (4.0 or later) and its language data on the
+    image, e.g. the tesseract-ocr Debian package.
+    """
+
+    name = "tesseract"
+
+    def __init__(self, dpi: int = OCR_DPI):
+        self.dpi = dpi
+
+    def iter_pages(self, content: bytes, page_count: int) -> Iterator[str]:
+        with pdf_pages.shared_copy(content) as path:
+            pool = pdf_pages.get_pool()
+            futures = [
+                pool.submit(tesseract_page, path, number, self.dpi)
+                for number in range(page_count)
+            ]
+            try:
+                for future in futures:
+                    deadline.check("ocr_page")
+                    with metrics.timed("ocr_page"):
+                        try:
+                            text = future.result(timeout=deadline.remaining())
+                        except concurrent.futures.TimeoutError:
+                            raise HTTPException(
+                                status.HTTP_504_GATEWAY_TIMEOUT,
+                                "Deadline exceeded during OCR.",
+                            )
+                    yield text
+            finally:
+                # Pages past an early stop are not run
+                for future in futures:
+                    future.cancel()
+
+
+OCR_BACKENDS = {
+    "vision": VisionOcrBackend,
+    "tesseract": TesseractOcrBackend,
+}
+
+_backend = None
+_lock = threading.Lock()
+
+
+def get_backend() -> OcrBackend:
+    """The OCR backend of this deployment, chosen by OCR_BACKEND."""
+    global _backend
+    with _lock:
+        if _backend is None:
+            _backend = OCR_BACKENDS[OCR_BACKEND]()
+        return _backend
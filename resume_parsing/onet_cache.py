@@ -0,0 +1,141 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from typing import Iterator, Optional, Tuple
+
+logger = logging.getLogger()
+logger.setLevel(level=logging.INFO)
+
+ONET_CACHE_SIZE = int(os.getenv("ONET_CACHE_SIZE", "10000"))
+ONET_CACHE_PATH = os.getenv("ONET_CACHE_PATH", "")
+
+RESUME_DATA_NS = "{http://tempuri.org/ResumeData.xsd}"
+
+
+def cache_key(job: dict) -> str:
+    """Key a job on its normalized title and a digest of its description."""
+    title = " ".join(re.findall(r"\w+", (job.get("POSN_NAM") or "").lower()))
+    description = " ".join((job.get("RESP_TXT") or "").lower().split())
+    digest = hashlib.sha1(description.encode("utf-8")).hexdigest()
+    return f"{title}|{digest}"
+
+
+class OnetCache:
+    """Memo of job -> (SOC code, score) with an LRU tier and a SQLite tier.
+
+    Entries are namespaced, normally by O*NET index version, so a rebuilt
+    index does not serve stale matches. A score of None marks an entry
+    imported from historical output.
+    """
+
+    def __init__(self, maxsize: int, path: str = None, namespace: str = ""):
+        self.maxsize = maxsize
+        self.namespace = namespace
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS onet_cache ("
+                "namespace TEXT, key TEXT, soc TEXT, score REAL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            self._db.commit()
+
+    def get(self, key: str) -> Optional[Tuple[str, Optional[float]]]:
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+                return self._lru[key]
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT soc, score FROM onet_cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            if row is not None:
+                self._remember(key, tuple(row))
+            return tuple(row) if row else None
+
+    def put(self, key: str, soc: str, score: Optional[float]):
+        self.put_many([(key, soc, score)])
+
+    def put_many(self, entries):
+        """Store (key, soc, score) entries in both tiers."""
+        entries = list(entries)
+        with self._lock:
+            for key, soc, score in entries:
+                self._remember(key, (soc, score))
+            if self._db is not None:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO onet_cache VALUES (?, ?, ?, ?)",
+                    [(self.namespace, key, soc, score) for key, soc, score in entries],
+                )
+                self._db.commit()
+
+    def _remember(self, key, value):
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.maxsize:
+            self._lru.popitem(last=False)
+
+    def warm(self, paths) -> int:
+        """Import job -> ONET_CD pairs from historical XML or JSON output.
+
+        Returns:
+            int: The number of entries imported.
+        """
+        count = 0
+        for path in paths:
+            try:
+                jobs = list(_historical_jobs(path))
+            except (ET.ParseError, ValueError) as err:
+                logger.warning(f"Skipping [{path}]: {err}")
+                continue
+            entries = [
+                (cache_key(job), str(job["ONET_CD"]), None)
+                for job in jobs
+                if job.get("ONET_CD")
+            ]
+            self.put_many(entries)
+            count += len(entries)
+        return count
+
+
+def _historical_jobs(path: str) -> Iterator[dict]:
+    with open(path, "rb") as f:
+        head = f.read(64).lstrip()[:1]
+        f.seek(0)
+        if head == b"{":
+            results = json.load(f)
+            yield from results["ResumeData"]["RSUM_WORK_HIST"]
+            return
+        root = ET.parse(f).getroot()
+    for job in root.iter(f"{RESUME_DATA_NS}RSUM_WORK_HIST"):
+        yield {child.tag.replace(RESUME_DATA_NS, ""): child.text for child in job}
+
+
+def main():
+    """Warm the on-disk O*NET cache from historical output."""
+    from resume_parsing import onet_similarity
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("files", nargs="+", help="ResumeData XML or JSON files")
+    args = parser.parse_args()
+    if not ONET_CACHE_PATH:
+        parser.error("ONET_CACHE_PATH must be set")
+
+    count = onet_similarity.get_cache().warm(args.files)
+    logger.info(f"Imported {count} jobs into {ONET_CACHE_PATH}")
+
+
+if __name__ == "__main__":
+    main()
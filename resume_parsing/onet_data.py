@@ -0,0 +1,112 @@
+import argparse
+import logging
+import os
+import pathlib
+from typing import List, NamedTuple
+
+import numpy as np
+
+logger = logging.getLogger()
+logger.setLevel(level=logging.INFO)
+
+STAGING_PATH = os.getenv("STAGING_PATH", "gs://wi-vcc-dev-ml-o-net/db_25_0_excel")
+ONET_DATA_PATH = os.getenv("ONET_DATA_PATH", "")
+
+
+class StringTable:
+    """Read-only list of strings stored as one UTF-8 blob plus offsets.
+
+    Both arrays can be memory-mapped, so every worker in the container
+    shares a single copy through the page cache.
+    """
+
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray):
+        self.offsets = offsets
+        self.blob = blob
+
+    @classmethod
+    def from_strings(cls, strings: List[str]) -> "StringTable":
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(s) for s in encoded], out=offsets[1:])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(offsets, blob)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.blob[start:end].tobytes().decode("utf-8")
+
+    def to_list(self) -> List[str]:
+        return [self[i] for i in range(len(self))]
+
+    def save(self, path: pathlib.Path, name: str):
+        np.save(path / f"{name}_offsets.npy", self.offsets)
+        np.save(path / f"{name}_blob.npy", self.blob)
+
+    @classmethod
+    def load(cls, path: pathlib.Path, name: str, mmap_mode=None) -> "StringTable":
+        return cls(
+            np.load(path / f"{name}_offsets.npy", mmap_mode=mmap_mode),
+            np.load(path / f"{name}_blob.npy", mmap_mode=mmap_mode),
+        )
+
+
+class OnetTable(NamedTuple):
+    """O*NET occupation data in columnar form, one row per occupation."""
+
+    soc: np.ndarray
+    title: StringTable
+    description: StringTable
+
+    def __len__(self) -> int:
+        return len(self.soc)
+
+    @classmethod
+    def from_frame(cls, onet) -> "OnetTable":
+        """Convert the "Occupation Data" spreadsheet as read by pandas."""
+        return cls(
+            soc=np.array(onet["O*NET-SOC Code"].to_list(), dtype=str),
+            title=StringTable.from_strings(onet["Title"].to_list()),
+            description=StringTable.from_strings(onet["Description"].to_list()),
+        )
+
+    def save(self, path: str):
+        path = pathlib.Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / "soc.npy", self.soc)
+        self.title.save(path, "title")
+        self.description.save(path, "description")
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "OnetTable":
+        path = pathlib.Path(path)
+        mmap_mode = "r" if mmap else None
+        return cls(
+            soc=np.load(path / "soc.npy", mmap_mode=mmap_mode),
+            title=StringTable.load(path, "title", mmap_mode),
+            description=StringTable.load(path, "description", mmap_mode),
+        )
+
+
+def read_excel() -> OnetTable:
+    import pandas as pd
+
+    return OnetTable.from_frame(pd.read_excel(f"{STAGING_PATH}/Occupation Data.xlsx"))
+
+
+def main():
+    """Convert O*NET Occupation Data.xlsx to the columnar format."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--out", required=True, help="Output directory")
+    args = parser.parse_args()
+
+    table = read_excel()
+    table.save(args.out)
+    logger.info(f"Wrote {len(table)} occupations to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+from resume_parsing.embedders import ONET_EMBEDDER, Embedder, get_embedder
+from resume_parsing.onet_data import OnetTable
+
+logger = logging.getLogger()
+logger.setLevel(level=logging.INFO)
+
+INDEX_FORMAT = 2
+LATEST = "LATEST"
+
+
+class OnetIndex(NamedTuple):
+    """Precomputed O*NET embeddings.
+
+    titles and descriptions are L2-normalized float32 matrices with one row
+    per occupation, aligned with the rows of onet.
+    """
+
+    onet: OnetTable
+    titles: np.ndarray
+    descriptions: np.ndarray
+    manifest: dict
+    path: pathlib.Path
+
+    @property
+    def soc(self) -> np.ndarray:
+        return self.onet.soc
+
+    @property
+    def version(self) -> str:
+        return self.manifest["version"]
+
+
+def normalize_rows(matrix) -> np.ndarray:
+    """L2-normalize each row as float32. All-zero rows are left as zeros."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+
+def similarity_floor(matrix: np.ndarray, sample: int = 2000, seed: int = 0) -> float:
+    """Median cosine similarity between distinct rows of a normalized matrix.
+
+    This is the score two unrelated texts typically get from the embedding
+    model, and is used to calibrate raw cosine scores.
+    """
+    rng = np.random.default_rng(seed)
+    rows = matrix[rng.choice(len(matrix), min(len(matrix), sample), replace=False)]
+    if len(rows) < 2:
+        return 0.0
+    sims = rows @ rows.T
+    return float(np.median(sims[~np.eye(len(rows), dtype=bool)]))
+
+
+def build_index(onet: OnetTable, embed: Embedder, out_dir: str) -> pathlib.Path:
+    """Embed the O*NET occupations and write a versioned index.
+
+    The occupation data is stored with the embeddings, so the index alone
+    serves code and title lookups.
+
+    Args:
+        onet (OnetTable): The O*NET occupation data.
+        embed (Embedder): The embedder. It is fit on the O*NET texts first,
+            and any learned state is saved with the index.
+        out_dir (str): Root directory of the index. Each build is written to
+            a subdirectory named after its version, and LATEST points at it.
+
+    Returns:
+        pathlib.Path: The directory of the new index version.
+    """
+    model = embed.name
+    soc = onet.soc
+    onet_titles = onet.title.to_list()
+    onet_descriptions = onet.description.to_list()
+    embed.fit(onet_titles + onet_descriptions)
+    titles = normalize_rows(embed(onet_titles))
+    descriptions = normalize_rows(embed(onet_descriptions))
+
+    h = hashlib.sha256(model.encode("utf-8"))
+    for array in (soc, titles, descriptions):
+        h.update(np.ascontiguousarray(array).tobytes())
+    version = h.hexdigest()[:12]
+
+    root = pathlib.Path(out_dir)
+    path = root / version
+    path.mkdir(parents=True, exist_ok=True)
+    onet.save(path)
+    np.save(path / "titles.npy", titles)
+    np.save(path / "descriptions.npy", descriptions)
+    embed.save(path)
+    manifest = {
+        "format": INDEX_FORMAT,
+        "version": version,
+        "model": model,
+        "occupations": len(soc),
+        "dimensions": titles.shape[1],
+        "calibration": {
+            "title_floor": similarity_floor(titles),
+            "description_floor": similarity_floor(descriptions),
+        },
+        "built": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    with open(path / "manifest.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    tmp = root / f"{LATEST}.tmp"
+    tmp.write_text(version)
+    os.replace(tmp, root / LATEST)
+    logger.info(f"Wrote O*NET index [{version}] to {path}")
+    return path
+
+
+def load_index(path: str, mmap: bool = True) -> OnetIndex:
+    """Load an index written by build_index.
+
+    Args:
+        path (str): An index version directory, or the index root in which
+            case the LATEST version is loaded.
+        mmap (bool): Memory-map the matrices read-only instead of reading
+            them into memory.
+
+    Returns:
+        OnetIndex: The index.
+    """
+    path = pathlib.Path(path)
+    if (path / LATEST).exists():
+        path = path / (path / LATEST).read_text().strip()
+    with open(path / "manifest.json") as f:
+        manifest = json.load(f)
+    if manifest["format"] != INDEX_FORMAT:
+        raise ValueError(
+            f"Unsupported O*NET index format [{manifest['format']}] in {path}"
+        )
+
+    mmap_mode = "r" if mmap else None
+    return OnetIndex(
+        onet=OnetTable.load(path, mmap=mmap),
+        titles=np.load(path / "titles.npy", mmap_mode=mmap_mode),
+        descriptions=np.load(path / "descriptions.npy", mmap_mode=mmap_mode),
+        manifest=manifest,
+        path=path,
+    )
+
+
+def main():
+    """Build the O*NET embedding index."""
+    from resume_parsing import onet_similarity
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--out", required=True, help="Index root directory")
+    parser.add_argument(
+        "--embedder",
+        default=ONET_EMBEDDER,
+        help="hashing or use (default: %(default)s)",
+    )
+    args = parser.parse_args()
+
+    build_index(onet_similarity.get_onet(), get_embedder(args.embedder), args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+
+from resume_parsing.onet_index import normalize_rows
+
+logger = logging.getLogger()
+logger.setLevel(level=logging.INFO)
+
+
+def top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact top-k of each row of a score matrix, best first.
+
+    Uses argpartition so only the k winners of each row are sorted.
+
+    Args:
+        scores (np.ndarray): Matrix of shape (queries, candidates).
+        k (int): The number of results per row.
+
+    Returns:
+        Tuple[np.ndarray]: Column indices and scores, both (queries, k).
+    """
+    scores = np.asarray(scores)
+    k = min(k, scores.shape[1])
+    if k < scores.shape[1]:
+        idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        idx = np.broadcast_to(np.arange(k), (scores.shape[0], k))
+    values = np.take_along_axis(scores, idx, axis=1)
+    order = np.argsort(-values, axis=1, kind="stable")
+    return (
+        np.take_along_axis(idx, order, axis=1),
+        np.take_along_axis(values, order, axis=1),
+    )
+
+
+class ExactIndex:
+    """Brute-force cosine search over a labelled set of vectors."""
+
+    def __init__(self, vectors: np.ndarray, labels: np.ndarray):
+        self.vectors = normalize_rows(vectors)
+        self.labels = np.asarray(labels)
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Find the k most similar vectors for a batch of queries.
+
+        Args:
+            queries (np.ndarray): Matrix of shape (queries, dimensions).
+            k (int): The number of results per query.
+
+        Returns:
+            Tuple[np.ndarray]: Labels and cosine scores, both (queries, k).
+        """
+        scores = normalize_rows(queries) @ self.vectors.T
+        idx, values = top_k(scores, k)
+        return self.labels[idx], values
+
+
+class IVFIndex:
+    """Approximate cosine search with an inverted file index.
+
+    Vectors are clustered with spherical k-means; a query only scores the
+    members of the n_probe clusters whose centroids are closest to it.
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        labels: np.ndarray,
+        n_lists: Optional[int] = None,
+        n_probe: int = 8,
+        iterations: int = 10,
+        seed: int = 0,
+    ):
+        self.vectors = normalize_rows(vectors)
+        self.labels = np.asarray(labels)
+        self.n_probe = n_probe
+        n_lists = n_lists or max(1, int(np.sqrt(len(self.vectors))))
+        self.centroids, assignment = self._train(n_lists, iterations, seed)
+
+        # Vectors are reordered so that the members of list i are the
+        # contiguous rows offsets[i] : offsets[i + 1]
+        order = np.argsort(assignment, kind="stable")
+        self.vectors = self.vectors[order]
+        self.labels = self.labels[order]
+        self.offsets = np.searchsorted(
+            assignment[order], np.arange(len(self.centroids) + 1)
+        )
+        logger.info(
+            f"Built IVF index with {len(self.centroids)} lists over "
+            f"{len(self.vectors)} vectors"
+        )
+
+    def _train(self, n_lists, iterations, seed):
+        rng = np.random.default_rng(seed)
+        n_lists = min(n_lists, len(self.vectors))
+        centroids = self.vectors[rng.choice(len(self.vectors), n_lists, replace=False)]
+        for _ in range(iterations):
+            assignment = np.argmax(self.vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, self.vectors)
+            empty = ~sums.any(axis=1)
+            sums[empty] = centroids[empty]
+            centroids = normalize_rows(sums)
+        return centroids, np.argmax(self.vectors @ centroids.T, axis=1)
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Find approximately the k most similar vectors for a batch of queries.
+
+        Rows with fewer than k candidates are padded with empty labels and
+        -inf scores.
+
+        Args:
+            queries (np.ndarray): Matrix of shape (queries, dimensions).
+            k (int): The number of results per query.
+
+        Returns:
+            Tuple[np.ndarray]: Labels and cosine scores, both (queries, k).
+        """
+        queries = normalize_rows(queries)
+        probes, _ = top_k(queries @ self.centroids.T, self.n_probe)
+        best_idx = np.full((len(queries), k), -1)
+        best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+
+        # Score list by list, each against every query that probes it, and
+        # merge into the running top-k of those queries
+        for i in np.unique(probes):
+            start, end = self.offsets[i], self.offsets[i + 1]
+            if start == end:
+                continue
+            rows = np.flatnonzero((probes == i).any(axis=1))
+            scores = queries[rows] @ self.vectors[start:end].T
+            merged_idx = np.hstack(
+                [best_idx[rows], np.broadcast_to(np.arange(start, end), scores.shape)]
+            )
+            merged_scores = np.hstack([best_scores[rows], scores])
+            idx, values = top_k(merged_scores, k)
+            best_idx[rows] = np.take_along_axis(merged_idx, idx, axis=1)
+            best_scores[rows] = values
+
+        labels = np.where(best_idx >= 0, self.labels[best_idx], "")
+        return labels, best_scores
+
+
+def recall_at_k(approximate: np.ndarray, exact: np.ndarray) -> float:
+    """Fraction of the exact top-k labels that the approximate search found."""
+    hits = sum(len(set(a) & set(e)) for a, e in zip(approximate, exact))
+    return hits / exact.size
@@ -1,122 +1,257 @@
-# import logging
-# import os
-# from typing import List
-
-# import numpy as np
-# import pandas as pd
-# import tensorflow_hub as hub
-# from fastapi import Request
-# from gcsfs import GCSFileSystem
-
-# logger = logging.getLogger()
-# logger.setLevel(level=logging.INFO)
-
-
-# fs = GCSFileSystem(timeout=1)
-
-# STAGING_PATH = os.getenv("STAGING_PATH", "gs://wi-vcc-dev-ml-o-net/db_25_0_excel")
-
-
-# def get_onet():
-#     return pd.read_excel(f"{STAGING_PATH}/Occupation Data.xlsx")
-
-
-# def get_embed():
-#     model_path = (
-#         os.environ.get("TFHUB_CACHE_DIR")
-#         or "https://tfhub.dev/google/universal-sentence-encoder/4"  # noqa: W503
-#     )
-#     return hub.load(model_path)
-
-
-# def recommend_onet(parsed_results: dict, request: Request = None) -> dict:
-#     """Recomends O*NET labels.
-
-#     Args:
-#         parsed_results (dict): The parsed results.
-
-#     Returns:
-#         dict: Parsed results with O*NET recommendations inserted.
-#     """
-#     jobs = parsed_results["ResumeData"]["RSUM_WORK_HIST"]
-#     recs = find_closest_onet_categories(jobs=jobs, request=request, top_n=1)
-#     parsed_results["ResumeData"]["RSUM_WORK_HIST"] = [
-#         {
-#             **orig,
-#             **{"ONET_CD": match[0]["SOC"]},
-#         }
-#         for orig, match in zip(parsed_results["ResumeData"]["RSUM_WORK_HIST"], recs)
-#     ]
-
-#     return parsed_results
-
-
-# def find_closest_onet_categories(
-#     jobs, top_n: int = 1, request: Request = None
-# ) -> List[List[dict]]:
-#     """Find the N closest categories for each job position.
-
-#     Batch method to find similar recommendations based on
-#     both job titles and descriptions.
-
-#     Args:
-#         jobs (dict): The dictionary of job data
-#         top_n (int): The number of positions to return per job position
-
-#     Returns:
-#         List[List[dict]]: Recommendations for each job position
-#     """
-#     if len(jobs) == 0:
-#         return []
-
-#     if request:
-#         onet = request.app.state.onet
-#         embed = request.app.state.embed
-#     else:
-#         onet = get_onet()
-#         embed = get_embed()
-#     titles = [
-#         x["POSN_NAM"] if x.get("POSN_NAM", None) is not None else "" for x in jobs
-#     ]
-
-#     # titles = [x["POSN_NAM"] if x["POSN_NAM"] is not None else "" for x in jobs]
-#     descriptions = [
-#         x["RESP_TXT"] if x.get("RESP_TXT", None) is not None else "" for x in jobs
-#     ]
-
-#     embeddings = embed(titles + descriptions)
-#     title_embed = embeddings[: len(titles)]
-#     descrip_embed = embeddings[len(titles) :]
-
-#     onet_title_embed = embed(onet["Title"].to_list())
-#     onet_descrip_embed = embed(onet["Description"].to_list())
-#     # Scores are normalized per resume; this should probably be fixed
-#     # so that we can set thresholds for filtering recommendations
-#     title_score = np.inner(title_embed, onet_title_embed) / (
-#         np.linalg.norm(title_embed) * np.linalg.norm(onet_title_embed)
-#     )
-#     title_score = (title_score - np.min(title_score)) / (
-#         np.max(title_score) - np.min(title_score)
-#     )
-#     descrip_score = np.inner(descrip_embed, onet_descrip_embed) / (
-#         np.linalg.norm(descrip_embed) * np.linalg.norm(onet_descrip_embed)
-#     )
-#     descrip_score = (descrip_score - np.min(descrip_score)) / (
-#         np.max(descrip_score) - np.min(descrip_score)
-#     )
-#     similarity_score = np.divide(
-#         2 * title_score * descrip_score, title_score + descrip_score
-#     )
-
-#     idx = (-similarity_score).argsort()[:, :top_n]
-#     recs = [
-#         [
-#             {
-#                 "SOC": onet.iloc[i]["O*NET-SOC Code"],
-#                 "Similarity": similarity_score[p, i],
-#             }
-#             for i in title
-#         ]
-#         for p, title in enumerate(idx)
-#     ]
-#     return recs
+import logging
+import os
+from functools import lru_cache
+from typing import List
+
+import numpy as np
+from fastapi import Request
+
+from resume_parsing import (
+    embedders,
+    metrics,
+    onet_cache,
+    onet_data,
+    onet_index,
+    onet_retrieval,
+)
+
+logger = logging.getLogger()
+logger.setLevel(level=logging.INFO)
+
+
+ONET_INDEX_PATH = os.getenv("ONET_INDEX_PATH", "")
+ONET_MIN_SCORE = float(os.getenv("ONET_MIN_SCORE", "0"))
+
+
+@lru_cache(maxsize=None)
+def get_onet() -> onet_data.OnetTable:
+    """O*NET occupation data, memory-mapped from ONET_DATA_PATH if converted."""
+    if onet_data.ONET_DATA_PATH:
+        return onet_data.OnetTable.load(onet_data.ONET_DATA_PATH)
+    return onet_data.read_excel()
+
+
+@lru_cache(maxsize=None)
+def get_embed() -> embedders.Embedder:
+    """The embedder the O*NET index was built with."""
+    index = get_index()
+    return embedders.get_embedder(index.manifest["model"], index.path)
+
+
+@lru_cache(maxsize=None)
+def get_index() -> onet_index.OnetIndex:
+    """The precomputed O*NET index, memory-mapped from ONET_INDEX_PATH."""
+    index = onet_index.load_index(ONET_INDEX_PATH)
+    logger.info(
+        f"Loaded O*NET index [{index.version}] with {len(index.soc)} occupations"
+    )
+    return index
+
+
+@lru_cache(maxsize=None)
+def get_cache() -> onet_cache.OnetCache:
+    """The job -> O*NET memo, namespaced by the index version."""
+    return onet_cache.OnetCache(
+        onet_cache.ONET_CACHE_SIZE,
+        path=onet_cache.ONET_CACHE_PATH,
+        namespace=get_index().version,
+    )
+
+
+def recommend_onet(parsed_results: dict, request: Request = None) -> dict:
+    """Recomends O*NET labels.
+
+    Args:
+        parsed_results (dict): The parsed results.
+
+    Returns:
+        dict: Parsed results with O*NET recommendations inserted.
+    """
+    return recommend_onet_batch([parsed_results], request=request)[0]
+
+
+def recommend_onet_batch(
+    parsed_results: List[dict], request: Request = None
+) -> List[dict]:
+    """Recomends O*NET labels for many resumes with one scoring call.
+
+    Scores are independent of the other resumes in the batch. Jobs whose
+    best score is below ONET_MIN_SCORE get no ONET_CD, nor do jobs without a
+    title or a description. Matches are memoized per job, so only jobs not
+    seen before are embedded and scored.
+
+    Args:
+        parsed_results ([dict]): The parsed results of each resume.
+
+    Returns:
+        [dict]: Parsed results with O*NET recommendations inserted.
+    """
+    cache = get_cache()
+    jobs = [
+        job
+        for results in parsed_results
+        for job in results["ResumeData"]["RSUM_WORK_HIST"]
+    ]
+    keys = [onet_cache.cache_key(job) for job in jobs]
+    matches = {key: cache.get(key) for key in set(keys)}
+
+    misses = [key for key, match in matches.items() if match is None]
+    metrics.count_cache("onet", len(matches) - len(misses), len(misses))
+    if misses:
+        first_job = dict(zip(reversed(keys), reversed(jobs)))
+        recs = find_closest_onet_categories(
+            jobs=[first_job[key] for key in misses],
+            request=request,
+            top_n=1,
+            min_score=-np.inf,
+        )
+        found = [
+            (key, rec[0]["SOC"], rec[0]["Similarity"])
+            for key, rec in zip(misses, recs)
+            if rec
+        ]
+        cache.put_many(found)
+        matches.update({key: (soc, score) for key, soc, score in found})
+
+    recs = iter(matches[key] for key in keys)
+    for results in parsed_results:
+        results["ResumeData"]["RSUM_WORK_HIST"] = [
+            {**orig, **{"ONET_CD": match[0]}} if _accept(orig, match) else orig
+            for orig, match in zip(results["ResumeData"]["RSUM_WORK_HIST"], recs)
+        ]
+
+    return parsed_results
+
+
+def _has_text(job: dict) -> bool:
+    # Empty jobs score alike against every occupation, so any match is noise
+    return any((job.get(field) or "").strip() for field in ("POSN_NAM", "RESP_TXT"))
+
+
+def _accept(job: dict, match) -> bool:
+    # Historical matches carry no score and are always accepted
+    return (
+        match is not None
+        and _has_text(job)
+        and (match[1] is None or match[1] >= ONET_MIN_SCORE)
+    )
+
+
+def find_closest_onet_categories(
+    jobs, top_n: int = 1, request: Request = None, min_score: float = None
+) -> List[List[dict]]:
+    """Find the N closest categories for each job position.
+
+    Batch method to find similar recommendations based on
+    both job titles and descriptions. O*NET embeddings come from the
+    precomputed index, so only the jobs are embedded per call.
+
+    Args:
+        jobs (dict): The dictionary of job data
+        top_n (int): The number of positions to return per job position
+        min_score (float): Drop recommendations scoring below this.
+            Defaults to ONET_MIN_SCORE.
+
+    Returns:
+        List[List[dict]]: Recommendations for each job position. Jobs with
+            neither a title nor a description get none.
+    """
+    if not any(_has_text(job) for job in jobs):
+        return [[] for _ in jobs]
+    scored = [job for job in jobs if _has_text(job)]
+    if len(scored) < len(jobs):
+        recs = iter(find_closest_onet_categories(scored, top_n, request, min_score))
+        return [next(recs) if _has_text(job) else [] for job in jobs]
+
+    if request and hasattr(request.app.state, "onet_index"):
+        index = request.app.state.onet_index
+        embed = request.app.state.embed
+    else:
+        index = get_index()
+        embed = get_embed()
+    if min_score is None:
+        min_score = ONET_MIN_SCORE
+    titles = [
+        x["POSN_NAM"] if x.get("POSN_NAM", None) is not None else "" for x in jobs
+    ]
+
+    descriptions = [
+        x["RESP_TXT"] if x.get("RESP_TXT", None) is not None else "" for x in jobs
+    ]
+
+    embeddings = np.asarray(embed(titles + descriptions), dtype=np.float32)
+    similarity_score = score_jobs(
+        embeddings[: len(titles)],
+        embeddings[len(titles) :],
+        index,
+        has_title=np.array([bool(t.strip()) for t in titles]),
+        has_description=np.array([bool(d.strip()) for d in descriptions]),
+    )
+
+    idx, scores = onet_retrieval.top_k(similarity_score, top_n)
+    recs = [
+        [
+            {
+                "SOC": str(index.soc[i]),
+                "Title": index.onet.title[i],
+                "Similarity": float(score),
+            }
+            for i, score in zip(title, title_scores)
+            if score >= min_score
+        ]
+        for title, title_scores in zip(idx, scores)
+    ]
+    return recs
+
+
+def score_jobs(
+    title_embed: np.ndarray,
+    descrip_embed: np.ndarray,
+    index: onet_index.OnetIndex,
+    has_title: np.ndarray = None,
+    has_description: np.ndarray = None,
+) -> np.ndarray:
+    """Calibrated similarity of every job to every O*NET occupation.
+
+    Title and description cosine scores are rescaled so that the typical
+    score of unrelated texts (the calibration floor recorded in the index)
+    maps to 0 and an exact match to 1, then combined with a harmonic mean.
+    Jobs lacking a title or a description are scored on the other field
+    alone. Scores depend only on the job, not on the rest of the batch.
+
+    Args:
+        title_embed (np.ndarray): Job title embeddings, one row per job.
+        descrip_embed (np.ndarray): Job description embeddings.
+        index (OnetIndex): The O*NET index.
+        has_title (np.ndarray): Boolean mask of jobs with a title.
+        has_description (np.ndarray): Boolean mask of jobs with a description.
+
+    Returns:
+        np.ndarray: float32 scores in [0, 1] of shape (jobs, occupations).
+    """
+    calibration = index.manifest.get("calibration", {})
+    title_score = _calibrate(
+        onet_index.normalize_rows(title_embed) @ index.titles.T,
+        calibration.get("title_floor", 0.0),
+    )
+    descrip_score = _calibrate(
+        onet_index.normalize_rows(descrip_embed) @ index.descriptions.T,
+        calibration.get("description_floor", 0.0),
+    )
+
+    total = title_score + descrip_score
+    similarity_score = np.divide(
+        2 * title_score * descrip_score,
+        total,
+        out=np.zeros_like(total),
+        where=total > 0,
+    )
+    if has_title is not None:
+        similarity_score[~has_title] = descrip_score[~has_title]
+    if has_description is not None:
+        similarity_score[~has_description] = title_score[~has_description]
+    return similarity_score
+
+
+def _calibrate(cosine: np.ndarray, floor: float) -> np.ndarray:
+    return np.clip((cosine - floor) / (1 - floor), 0, 1, out=cosine)
@@ -38,4 +38,11 @@ def recommend_onet(parsed_results: dict, request: Request = None) -> dict:
         for orig, match in zip(parsed_results["ResumeData"]["RSUM_WORK_HIST"], recs)
     ]
 
-    return parsed_results
\ No newline at end of file
+    return parsed_results
+
+
+def recommend_onet_batch(
+    parsed_results: List[dict], request: Request = None
+) -> List[dict]:
+    """Recomends O*NET labels for many resumes."""
+    return [recommend_onet(results, request=request) for results in parsed_results]
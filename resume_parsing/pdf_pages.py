@@ -0,0 +1,84 @@
+import contextlib
+import math
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+import fitz
+
+# Text-layer PDFs with at least this many pages are split across a pool of
+# processes. 0 always extracts in the worker itself.
+PDF_PARALLEL_PAGES = int(os.getenv("PDF_PARALLEL_PAGES", "0"))
+PDF_PARALLEL_WORKERS = int(os.getenv("PDF_PARALLEL_WORKERS", str(os.cpu_count())))
+# Fewest pages given to one process, below which the IPC isn't worth it
+PDF_PARALLEL_MIN_RANGE = int(os.getenv("PDF_PARALLEL_MIN_RANGE", "8"))
+# tmpfs, so the document is shared through memory rather than pickled
+SHARED_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+_pool = None
+_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    # The pool's processes and threads belong to the parent
+    global _pool, _lock
+    _pool = None
+    _lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """The extraction pool of this process, started on first use.
+
+    Its processes are spawned rather than forked, as the gunicorn worker has
+    gRPC and job threads running.
+    """
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                PDF_PARALLEL_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def shutdown():
+    """Stop the pool of this process, if it was started."""
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+def extract_range(path: str, start: int, stop: int) -> List[str]:
+    """The text layer of pages start to stop - 1 of the PDF at path."""
+    pdf = fitz.open(path)
+    try:
+        return [pdf[number].getText() for number in range(start, stop)]
+    finally:
+        pdf.close()
+
+
+def page_ranges(page_count: int, workers: int, min_range: int) -> List[range]:
+    """Split the pages into at most workers contiguous ranges."""
+    parts = max(1, min(workers, page_count // max(min_range, 1)))
+    size = math.ceil(page_count / parts)
+    return [
+        range(start, min(start + size, page_count))
+        for start in range(0, page_count, size)
+    ]
+
+
+@contextlib.contextmanager
+def shared_copy(content: bytes):
+    """Write a document to shared memory for the pool, and yield its path."""
+    with tempfile.NamedTemporaryFile(suffix=".pdf", dir=SHARED_DIR) as f:
+        f.write(content)
+        f.flush()
+        yield f.name
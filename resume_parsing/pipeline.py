@@ -0,0 +1,197 @@
+import argparse
+import logging
+import os
+import pathlib
+import time
+from base64 import b64decode
+from types import SimpleNamespace
+
+from fastapi import Request
+
+from resume_parsing import (
+    admission,
+    artifact_store,
+    custom_parser,
+    deadline,
+    doc_extractor,
+    embedders,
+    metrics,
+    ocr,
+    shadow,
+    singleflight,
+)
+from resume_parsing import ner_trigger_patch as ner_trigger
+from resume_parsing.utils import chunked, to_xml
+
+if os.getenv("ONET_INDEX_PATH"):
+    from resume_parsing import onet_similarity
+else:
+    from resume_parsing import onet_similarity_patch as onet_similarity
+
+logger = logging.getLogger()
+logger.setLevel(level=logging.INFO)
+
+ENDPOINT_NAME = os.getenv("ENDPOINT_NAME", "resume_parsing_qa_09_03_2021")
+
+# Stage versions. An artifact is only reused when the version of the stage
+# that produced it is unchanged; code versions default to a hash of the source.
+EXTRACTOR_VERSION = os.getenv(
+    "EXTRACTOR_VERSION",
+    f"{artifact_store.source_version(doc_extractor)}-"
+    f"{artifact_store.source_version(ocr)}-{ocr.OCR_BACKEND}",
+)
+NER_VERSION = os.getenv("NER_VERSION", ENDPOINT_NAME)
+PARSER_VERSION = os.getenv(
+    "PARSER_VERSION", artifact_store.source_version(custom_parser)
+)
+
+# Identical resumes in flight at once, such as client retries of a request
+# that is still running, share one run, and resumes with the same text one
+# NER call
+SINGLE_FLIGHT = os.getenv("SINGLE_FLIGHT", "true").lower() in ("1", "true", "yes")
+_resumes = singleflight.Group("resume")
+_flights = {"ner": singleflight.Group("ner")}
+
+
+def preload():
+    """Build heavy read-only state before gunicorn forks the workers.
+
+    Only fork-safe state is built here. gRPC clients, SQLite connections and
+    TensorFlow models are created lazily in each worker instead.
+    """
+    if os.getenv("ONET_INDEX_PATH"):
+        index = onet_similarity.get_index()
+        if embedders.fork_safe(index.manifest["model"]):
+            onet_similarity.get_embed()
+    logger.info("Preloaded shared state")
+
+
+def process(file: str, file_extension: str, request: Request = None) -> dict:
+    """Runs a resume through extraction, NER, parsing and O*NET matching.
+
+    When an artifact store is configured, the output of each stage is
+    persisted keyed on the content of its inputs and the stage version, and
+    reused on later runs.
+
+    The decoded file must first be admitted by `admission`, and each stage
+    is skipped with HTTP 504 once the request's deadline has passed.
+    Requests for a file already being processed wait for its result instead,
+    without being admitted and charged for it themselves.
+
+    Args:
+        file (str): A base64-encoded string containing the file.
+        file_extension (str): The file extension of the resume.
+        request (Request): The incoming request.
+
+    Returns:
+        dict: The parsed results with O*NET recommendations.
+    """
+    with metrics.timed("decode"):
+        content = b64decode(file)
+
+    def run():
+        with admission.admit(content, file_extension):
+            return process_content(content, file_extension, request=request)
+
+    with metrics.peak_rss():
+        if not SINGLE_FLIGHT:
+            return run()
+        return _resumes.do(artifact_store.digest(content, file_extension.lower()), run)
+
+
+def process_content(content: bytes, file_extension: str, request: Request = None):
+    """Runs the pipeline on an already decoded file. See `process`."""
+    parsed_results = parse_content(content, file_extension, request=request)
+    deadline.check("onet")
+    with metrics.timed("onet"):
+        return onet_similarity.recommend_onet(parsed_results, request=request)
+
+
+def parse_content(content: bytes, file_extension: str, request: Request = None):
+    """Runs extraction, NER and parsing, without O*NET matching."""
+    store = artifact_store.get_store()
+
+    text = _stage(
+        store,
+        "text",
+        EXTRACTOR_VERSION,
+        artifact_store.digest(content, file_extension.lower()),
+        lambda: doc_extractor.process_by_filetype(content, file_extension),
+    )
+    text_key = artifact_store.digest(text)
+    entities = _stage(
+        store,
+        "ner",
+        NER_VERSION,
+        text_key,
+        lambda: ner_trigger.predict_entities(text, request=request),
+    )
+
+    def parse():
+        start = time.thread_time()
+        parsed = custom_parser.parse(entities, text)
+        shadow.submit(entities, text, parsed, time.thread_time() - start)
+        return parsed
+
+    return _stage(
+        store,
+        "parsed",
+        PARSER_VERSION,
+        artifact_store.digest(text_key, NER_VERSION, entities),
+        parse,
+    )
+
+
+def _stage(store, stage, version, key, compute):
+    def run():
+        deadline.check(stage)
+        with metrics.timed(stage):
+            return compute()
+
+    def cached():
+        if store is None:
+            return run()
+        return store.cached(stage, version, key, run)
+
+    if SINGLE_FLIGHT and stage in _flights:
+        return _flights[stage].do((version, key), cached)
+    return cached()
+
+
+def main():
+    """Reprocess a local corpus, writing one XML file per resume."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("files", nargs="+", type=pathlib.Path)
+    parser.add_argument("--out", type=pathlib.Path, required=True)
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        default=500,
+        help="Resumes scored together in one O*NET call",
+    )
+    args = parser.parse_args()
+
+    request = SimpleNamespace(
+        app=SimpleNamespace(state=SimpleNamespace(endpoint_name=ENDPOINT_NAME))
+    )
+    args.out.mkdir(parents=True, exist_ok=True)
+    for shard in chunked(args.files, args.shard_size):
+        parsed = []
+        for path in shard:
+            try:
+                parsed.append(
+                    (path, parse_content(path.read_bytes(), path.suffix, request))
+                )
+            except Exception as err:
+                logger.error(f"Failed to process [{path}]: {err}")
+
+        final_results = onet_similarity.recommend_onet_batch(
+            [results for _, results in parsed], request=request
+        )
+        for (path, _), results in zip(parsed, final_results):
+            (args.out / f"{path.stem}.xml").write_text(to_xml(results))
+        logger.info(f"Processed {len(parsed)} of {len(shard)} resumes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import contextlib
+import logging
+import os
+import pathlib
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import List, Optional
+
+logger = logging.getLogger()
+logger.setLevel(level=logging.INFO)
+
+# Profiling is off unless PROFILE_DIR is set. A request is then profiled when
+# it carries the X-Profile header, or at random with PROFILE_SAMPLE_RATE.
+PROFILE_DIR = os.getenv("PROFILE_DIR", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "100"))
+
+PROFILE_HEADER = "x-profile"
+PROFILE_SUFFIX = ".folded"
+PROFILE_ID_PATTERN = re.compile(r"^[\w.-]{1,128}$")
+
+
+class Sampler(threading.Thread):
+    """Samples the stack of one thread at a fixed interval.
+
+    Stacks are kept in the folded format read by flamegraph.pl and
+    speedscope: frames from the outermost in, separated by semicolons.
+    """
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_INTERVAL):
+        super().__init__(name="profiler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[_fold(frame)] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+def _fold(frame) -> str:
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(
+            f"{code.co_name} ({os.path.basename(code.co_filename)}:"
+            f"{code.co_firstlineno})"
+        )
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+
+def should_profile(request) -> bool:
+    if not PROFILE_DIR:
+        return False
+    if request is not None and request.headers.get(PROFILE_HEADER):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+@contextlib.contextmanager
+def profiled(request=None):
+    """Profile the calling thread for the duration of the block, if selected.
+
+    Yields:
+        str: The ID the profile is saved under, or None when not profiling.
+    """
+    if not should_profile(request):
+        yield None
+        return
+
+    request_id = request.headers.get("x-request-id") if request else None
+    if not request_id or not PROFILE_ID_PATTERN.match(request_id):
+        request_id = uuid.uuid4().hex
+    profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{request_id}"
+
+    sampler = Sampler(threading.get_ident())
+    start = time.perf_counter()
+    sampler.start()
+    try:
+        yield profile_id
+    finally:
+        sampler.stop()
+        elapsed = time.perf_counter() - start
+        save(profile_id, sampler.folded())
+        logger.info(
+            "Saved profile [%s]: %d samples over %.3fs",
+            profile_id,
+            sum(sampler.stacks.values()),
+            elapsed,
+        )
+
+
+def save(profile_id: str, folded: str):
+    root = pathlib.Path(PROFILE_DIR)
+    root.mkdir(parents=True, exist_ok=True)
+    (root / f"{profile_id}{PROFILE_SUFFIX}").write_text(folded)
+    for old in _paths()[PROFILE_KEEP:]:
+        try:
+            old.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _paths() -> List[pathlib.Path]:
+    """Saved profiles, newest first."""
+    if not PROFILE_DIR or not os.path.isdir(PROFILE_DIR):
+        return []
+    paths = pathlib.Path(PROFILE_DIR).glob(f"*{PROFILE_SUFFIX}")
+    return sorted(paths, key=lambda p: p.name, reverse=True)
+
+
+def list_profiles() -> List[dict]:
+    """Metadata of the saved profiles, newest first."""
+    profiles = []
+    for path in _paths():
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        profiles.append(
+            {
+                "id": path.name[: -len(PROFILE_SUFFIX)],
+                "bytes": stat.st_size,
+                "created": time.strftime(
+                    "%Y-%m-%dT%H:%M:%SZ", time.gmtime(stat.st_mtime)
+                ),
+            }
+        )
+    return profiles
+
+
+def load_profile(profile_id: str) -> Optional[str]:
+    """The folded stacks of a saved profile, or None if there is none."""
+    if not PROFILE_DIR or not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    try:
+        return (pathlib.Path(PROFILE_DIR) / f"{profile_id}{PROFILE_SUFFIX}").read_text()
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,75 @@
+import bisect
+from typing import List, Optional, Tuple
+
+
+class ResumeText(str):
+    """Resume text that derives its views once and caches them.
+
+    It is a str, so NER offsets index it exactly as they index the original
+    text, and slices of it are plain strings. The parser builds one per
+    request and hands it to every extractor, which then share the line
+    splits, case-folded lines and line-break offsets instead of each deriving
+    its own.
+    """
+
+    @classmethod
+    def of(cls, text: str) -> "ResumeText":
+        """Wrap text, unless it is already wrapped."""
+        return text if isinstance(text, cls) else cls(text)
+
+    def _view(self, name, compute):
+        views = self.__dict__
+        if name not in views:
+            views[name] = compute()
+        return views[name]
+
+    @property
+    def lines(self) -> Tuple[str, ...]:
+        """The text split on line breaks."""
+        return self._view("lines", lambda: tuple(self.split("\n")))
+
+    @property
+    def folded_lines(self) -> Tuple[str, ...]:
+        """The lines in lower case, for case-insensitive searches."""
+        return self._view(
+            "folded_lines", lambda: tuple(line.lower() for line in self.lines)
+        )
+
+    @property
+    def line_breaks(self) -> List[int]:
+        """Offsets of the line breaks, in order."""
+
+        def compute():
+            breaks, start = [], self.find("\n")
+            while start != -1:
+                breaks.append(start)
+                start = self.find("\n", start + 1)
+            return breaks
+
+        return self._view("line_breaks", compute)
+
+    def line_break_before(self, offset: int, n: int) -> Optional[int]:
+        """The offset of the nth line break before offset, counting back from 1.
+
+        Returns:
+            int: The offset, or None if there are fewer than n line breaks.
+        """
+        i = bisect.bisect_left(self.line_breaks, offset)
+        return self.line_breaks[i - n] if i >= n else None
+
+    def line_breaks_after(self, offset: int) -> int:
+        """The number of line breaks at or after offset."""
+        return len(self.line_breaks) - bisect.bisect_left(self.line_breaks, offset)
+
+    def line_break_after(self, offset: int, n: int) -> Optional[int]:
+        """The offset of the nth line break at or after offset, from 1.
+
+        Returns:
+            int: The offset, or None if there are fewer than n line breaks.
+        """
+        i = bisect.bisect_left(self.line_breaks, offset) + n - 1
+        return self.line_breaks[i] if i < len(self.line_breaks) else None
+
+    def collapsed(self, start: int, end: int) -> str:
+        """The text from start to end with runs of whitespace collapsed."""
+        return " ".join(self[start:end].split())
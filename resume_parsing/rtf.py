@@ -0,0 +1,154 @@
+import re
+
+# A control word with its optional numeric argument, a hex-escaped byte, a
+# control symbol, a group brace, a line break in the source, or plain text
+TOKEN = re.compile(
+    r"\\([a-z]{1,32})(-?\d{1,10})?[ ]?|\\'([0-9a-f]{2})|\\([^a-z])|([{}])"
+    r"|[\r\n]+|([^\\{}\r\n]+)",
+    re.IGNORECASE,
+)
+
+# Groups whose content is not part of the document text. Fields are kept,
+# as the result of a hyperlink field is its visible text.
+DESTINATIONS = frozenset(
+    (
+        "aftncn aftnsep aftnsepc annotation atnauthor atndate atnicn atnid atnparent "
+        "atnref atntime atrfend atrfstart author background bkmkend bkmkstart blipuid "
+        "buptim category colorschememapping colortbl comment company creatim "
+        "datafield datastore defchp defpap do doccomm docvar dptxbxtext ebcend "
+        "ebcstart factoidname falt fchars ffdeftext ffentrymcr ffexitmcr ffformat "
+        "ffhelptext ffl ffname ffstattext file filetbl fldinst fldtype fname fontemb "
+        "fontfile fonttbl footer footerf footerl footerr footnote formfield ftncn "
+        "ftnsep ftnsepc g generator gridtbl header headerf headerl headerr hl hlfr "
+        "hlinkbase hlloc hlsrc hsv htmltag info keycode keywords latentstyles lchars "
+        "levelnumbers leveltext lfolevel linkval list listlevel listname listoverride "
+        "listoverridetable listpicture liststylename listtable listtext "
+        "lsdlockedexcept macc maccPr mailmerge maln malnScr manager margPr mbar "
+        "mbarPr mbaseJc mbegChr mborderBox mborderBoxPr mbox mboxPr mchr mcount "
+        "mctrlPr md mdeg mdegHide mden mdiff mdPr me mendChr meqArr meqArrPr mf "
+        "mfName mfPr mfunc mfuncPr mgroupChr mgroupChrPr mgrow mhideBot mhideLeft "
+        "mhideRight mhideTop mhtmltag mlim mlimloc mlimlow mlimlowPr mlimupp "
+        "mlimuppPr mm mmaddfieldname mmath mmathPict mmathPr mmaxdist mmc mmcJc "
+        "mmconnectstr mmconnectstrdata mmcPr mmcs mmdatasource mmheadersource "
+        "mmmailsubject mmodso mmodsofilter mmodsofldmpdata mmodsomappedname "
+        "mmodsoname mmodsorecipdata mmodsosort mmodsosrc mmodsotable mmodsoudl "
+        "mmodsoudldata mmodsouniquetag mmPr mmquery mmr mnary mnaryPr mnoBreak mnum "
+        "mobjDist moMath moMathPara moMathParaPr mopEmu mphant mphantPr mplcHide mpos "
+        "mr mrad mradPr mrPr msepChr mshow mshp msPre msPrePr msSub msSubPr msSubSup "
+        "msSubSupPr msSup msSupPr mstrikeBLTR mstrikeH mstrikeTLBR mstrikeV msub "
+        "msubHide msup msupHide mtransp mtype mvertJc mvfmf mvfml mvtof mvtol "
+        "mzeroAsc mzeroDesc mzeroWid nesttableprops nextfile nonesttables objalias "
+        "objclass objdata object objname objsect objtime oldcprops oldpprops "
+        "oldsprops oldtprops oleclsid operator panose password passwordhash pgp "
+        "pgptbl picprop pict pn pnseclvl pntext pntxta pntxtb printim private "
+        "propname protend protstart protusertbl pxe revtbl revtim rsidtbl rxe shp "
+        "shpgrp shpinst shppict shprslt shptxt sn sp staticval stylesheet subject sv "
+        "svb tc template themedata title txe ud upr userprops wgrffmtfilter "
+        "windowcaption writereservation writereservhash xe xform xmlattrname "
+        "xmlattrvalue xmlclose xmlname xmlnstbl xmlopen"
+    ).split()
+)
+
+# Control words that stand for a character
+SPECIAL = {
+    "par": "\n",
+    "sect": "\n\n",
+    "page": "\n\n",
+    "line": "\n",
+    "row": "\n",
+    "tab": "\t",
+    "cell": " ",
+    "nestcell": " ",
+    "emdash": "\u2014",
+    "endash": "\u2013",
+    "emspace": "\u2003",
+    "enspace": "\u2002",
+    "qmspace": "\u2005",
+    "bullet": "\u2022",
+    "lquote": "\u2018",
+    "rquote": "\u2019",
+    "ldblquote": "\u201c",
+    "rdblquote": "\u201d",
+}
+
+
+def to_text(content: bytes) -> str:
+    """Extract the text of an RTF document, without running unrtf.
+
+    Groups such as the font table, pictures and document info are skipped,
+    and hex escapes are decoded with the document's code page.
+
+    Args:
+        content (bytes): The RTF document.
+
+    Returns:
+        str: The document text, one line per paragraph.
+    """
+    stack = []
+    ignorable = False
+    uc_skip = 1  # Fallback characters after each \\u character
+    skip = 0
+    codepage = "cp1252"
+    out = []
+    for match in TOKEN.finditer(content.decode("latin-1")):
+        word, arg, hex_byte, symbol, brace, text = match.groups()
+        if brace:
+            skip = 0
+            if brace == "{":
+                stack.append((uc_skip, ignorable))
+            elif stack:
+                uc_skip, ignorable = stack.pop()
+        elif symbol:
+            skip = 0
+            if symbol == "*":
+                ignorable = True
+            elif ignorable:
+                pass
+            elif symbol == "~":
+                out.append("\xa0")
+            elif symbol in "\\{}":
+                out.append(symbol)
+            elif symbol == "_":
+                out.append("-")
+            elif symbol in "\r\n":
+                out.append("\n")
+        elif word:
+            skip = 0
+            if word in DESTINATIONS:
+                ignorable = True
+            elif word == "ansicpg" and arg:
+                codepage = f"cp{arg}"
+            elif ignorable:
+                pass
+            elif word in SPECIAL:
+                out.append(SPECIAL[word])
+            elif word == "uc" and arg:
+                uc_skip = int(arg)
+            elif word == "u" and arg:
+                code = int(arg)
+                out.append(chr(code + 0x10000 if code < 0 else code))
+                skip = uc_skip
+        elif hex_byte:
+            if skip > 0:
+                skip -= 1
+            elif not ignorable:
+                out.append(_decode_byte(int(hex_byte, 16), codepage))
+        elif text:
+            if skip > 0:
+                # Fallback characters for the preceding \\u character
+                dropped = min(skip, len(text))
+                text = text[dropped:]
+                skip -= dropped
+            if text and not ignorable:
+                out.append(text)
+    # Characters outside the BMP come as two \\u surrogates; pair them up
+    return (
+        "".join(out).encode("utf-16-le", "surrogatepass").decode("utf-16-le", "replace")
+    )
+
+
+def _decode_byte(byte: int, codepage: str) -> str:
+    try:
+        return bytes([byte]).decode(codepage)
+    except (LookupError, UnicodeDecodeError):
+        return bytes([byte]).decode("cp1252", errors="replace")
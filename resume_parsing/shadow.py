@@ -0,0 +1,197 @@
+import copy
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from resume_parsing import artifact_store, metrics
+
+logger = logging.getLogger()
+logger.setLevel(level=logging.INFO)
+
+# Candidate parser to shadow the primary one with, as "module" or
+# "module:function" for a function other than parse. Empty disables shadowing.
+SHADOW_PARSER = os.getenv("SHADOW_PARSER", "")
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.05"))
+SHADOW_LOG_PATH = os.getenv("SHADOW_LOG_PATH", "/tmp/resume_parsing_shadow.jsonl")
+# Only the paths of differing fields are logged, unless this is set. The
+# values are names, emails and phone numbers, so keep such logs short-lived.
+SHADOW_LOG_VALUES = os.getenv("SHADOW_LOG_VALUES", "0").lower() in ("1", "true", "yes")
+# Share of one core the shadow process may use, and its niceness
+SHADOW_MAX_CPU = float(os.getenv("SHADOW_MAX_CPU", "0.1"))
+SHADOW_NICE = int(os.getenv("SHADOW_NICE", "19"))
+# Sampled resumes waiting for the shadow process beyond this are dropped
+SHADOW_MAX_PENDING = int(os.getenv("SHADOW_MAX_PENDING", "8"))
+
+_pool = None
+_pid = None
+_pending = 0
+_lock = threading.Lock()
+_candidate = None
+
+
+def _reset_after_fork():
+    global _pool, _pid, _pending, _lock
+    _pool, _pid, _pending = None, None, 0
+    _lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _init(parser: str, nice: int):
+    global _candidate
+    os.nice(nice)
+    # The candidate's parser timers would otherwise add to the primary's
+    metrics.local_only()
+    module, _, function = parser.partition(":")
+    _candidate = getattr(importlib.import_module(module), function or "parse")
+
+
+def flatten(value, path: str = "") -> dict:
+    """Leaf values of nested dicts and lists, keyed by their path."""
+    if isinstance(value, dict):
+        leaves = {}
+        for key, item in value.items():
+            leaves.update(flatten(item, f"{path}.{key}" if path else str(key)))
+        return leaves
+    if isinstance(value, (list, tuple)):
+        leaves = {}
+        for i, item in enumerate(value):
+            leaves.update(flatten(item, f"{path}[{i}]"))
+        return leaves if leaves else {path: value}
+    return {path: value}
+
+
+def diff(primary: dict, candidate: dict, values: bool = False) -> list:
+    """The fields of two ResumeData results that differ.
+
+    Returns:
+        list: The paths of the fields, or with values, dicts of each path
+            and the two values.
+    """
+    primary, candidate = flatten(primary), flatten(candidate)
+    fields = [
+        field
+        for field in sorted(primary.keys() | candidate.keys())
+        if primary.get(field) != candidate.get(field)
+    ]
+    if not values:
+        return fields
+    return [
+        {
+            "field": field,
+            "primary": primary.get(field),
+            "candidate": candidate.get(field),
+        }
+        for field in fields
+    ]
+
+
+def _run(entities: dict, text: str, primary: dict, primary_seconds: float) -> str:
+    """Run the candidate in the shadow process, and log how it compares."""
+    start = time.thread_time()
+    record = {
+        "time": time.time(),
+        "text": artifact_store.digest(text)[:16],
+        "primary_seconds": primary_seconds,
+    }
+    try:
+        candidate = _candidate(entities, text)
+    except Exception as err:
+        record["error"] = repr(err)
+        result = "error"
+    else:
+        seconds = time.thread_time() - start
+        record["candidate_seconds"] = seconds
+        record["ratio"] = seconds / primary_seconds if primary_seconds else None
+        record["diffs"] = diff(primary, candidate, SHADOW_LOG_VALUES)
+        result = "diff" if record["diffs"] else "match"
+    with open(SHADOW_LOG_PATH, "a") as f:
+        f.write(json.dumps(record, default=str) + "\n")
+    # Idle long enough to keep this process under its share of a core
+    used = time.thread_time() - start
+    if 0 < SHADOW_MAX_CPU < 1:
+        time.sleep(used * (1 / SHADOW_MAX_CPU - 1))
+    return result
+
+
+def _done(future):
+    global _pending
+    with _lock:
+        _pending -= 1
+    try:
+        metrics.SHADOW.labels(future.result()).inc()
+    except Exception as err:
+        metrics.SHADOW.labels("failed").inc()
+        logger.error("Shadow parser failed: %s", err)
+
+
+def submit(entities: dict, text: str, primary: dict, primary_seconds: float):
+    """Compare a sample of primary parses with the candidate, off the request.
+
+    The candidate runs in a single niced process, so shadowing takes at most
+    SHADOW_MAX_CPU of one core away from the workers, and samples are dropped
+    rather than queued when it falls behind.
+
+    Args:
+        entities (dict): The NER prediction response.
+        text (str): Resume text.
+        primary (dict): The primary parser's ResumeData.
+        primary_seconds (float): CPU time of the primary parse.
+    """
+    global _pool, _pid, _pending
+    if not SHADOW_PARSER or random.random() >= SHADOW_SAMPLE_RATE:
+        return
+    with _lock:
+        if _pending >= SHADOW_MAX_PENDING:
+            metrics.SHADOW.labels("dropped").inc()
+            return
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                1,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init,
+                initargs=(SHADOW_PARSER, SHADOW_NICE),
+            )
+            _pid = _pool.submit(os.getpid)
+        _pending += 1
+        pool = _pool
+    # Copied now, as the pool pickles it later and O*NET matching adds to it
+    primary = copy.deepcopy(primary)
+    try:
+        future = pool.submit(_run, entities, str(text), primary, primary_seconds)
+    except Exception as err:
+        # The pool is broken, e.g. the candidate failed to import
+        logger.error("Shadow parser unavailable: %s", err)
+        with _lock:
+            _pending -= 1
+            if _pool is pool:
+                _pool, pid, _pid = None, _pid, None
+            else:
+                pid = None
+        _forget(pid)
+        return
+    future.add_done_callback(_done)
+
+
+def shutdown():
+    """Stop the shadow process of this worker, if it was started."""
+    global _pool, _pid
+    with _lock:
+        pool, _pool = _pool, None
+        pid, _pid = _pid, None
+    if pool is not None:
+        pool.shutdown(wait=False)
+    _forget(pid)
+
+
+def _forget(pid):
+    # Drop the gauges the shadow process left, once it is gone
+    if pid is not None and pid.done() and not pid.cancelled() and not pid.exception():
+        metrics.mark_process_dead(pid.result())
@@ -0,0 +1,65 @@
+import threading
+from typing import Callable, Hashable
+
+from fastapi import HTTPException, status
+
+from resume_parsing import deadline, metrics
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class Group:
+    """Coalesces concurrent calls with the same key into one.
+
+    The first caller of a key runs the function, and callers arriving while it
+    runs wait for and share its result or exception. Each caller waits no
+    longer than its own deadline. A leader stopped by its deadline does not
+    fail the others: they run the function themselves.
+
+    Calls are only coalesced within a process, not across gunicorn workers.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as err:
+                call.error = err
+                raise
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+            return call.result
+
+        metrics.COALESCED.labels(self.name).inc()
+        left = deadline.remaining()
+        if not call.done.wait(None if left is None else max(left, 0)):
+            raise HTTPException(
+                status.HTTP_504_GATEWAY_TIMEOUT,
+                f"Deadline exceeded waiting for {self.name}.",
+            )
+        error = call.error
+        if (
+            isinstance(error, HTTPException)
+            and error.status_code == status.HTTP_504_GATEWAY_TIMEOUT
+        ):
+            return self.do(key, fn)
+        if error is not None:
+            raise error
+        return call.result
@@ -2,7 +2,7 @@ import logging
 import pathlib
 import re
 from itertools import islice
-from typing import List
+from typing import Iterator, List, TextIO
 from xml.sax.saxutils import escape
 
 import numpy as np
@@ -59,30 +59,62 @@ class GCSPath(pathlib.PurePosixPath):
 
 def to_xml(results) -> str:
     """Convert the dictionary to an XML string."""
-    _internal = ""
+    return "".join(iter_xml(results))
+
+
+def write_xml(results, buffer: TextIO):
+    """Write the XML serialization of the dictionary to a text buffer."""
+    buffer.writelines(iter_xml(results))
+
+
+def stream_xml(results, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Yield the UTF-8 encoded XML in chunks of roughly chunk_size bytes.
+
+    Suitable as the body of a StreamingResponse.
+    """
+    pending = []
+    size = 0
+    for part in iter_xml(results):
+        pending.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            yield "".join(pending).encode("utf-8")
+            pending = []
+            size = 0
+    if pending:
+        yield "".join(pending).encode("utf-8")
+
+
+def iter_xml(results) -> Iterator[str]:
+    """Yield the XML serialization of the dictionary piece by piece."""
     if isinstance(results, dict):
         for key, value in results.items():
             if key == "ResumeData":
-                _internal += '<?xml version="1.0" standalone="yes"?>\n'
-                _internal += f'<{key}  xmlns="http://tempuri.org/ResumeData.xsd">'
-                _internal += to_xml(value)
-                _internal += f"</{key}>"
+                yield '<?xml version="1.0" standalone="yes"?>\n'
+                yield f'<{key}  xmlns="http://tempuri.org/ResumeData.xsd">'
+                yield from iter_xml(value)
+                yield f"</{key}>"
             elif isinstance(value, list):
                 for elem in value:
-                    _internal += f"<{key}>"
-                    _internal += to_xml(elem)
-                    _internal += f"</{key}>"
+                    if isinstance(elem, dict):
+                        yield f"<{key}>"
+                        yield from iter_xml(elem)
+                        yield f"</{key}>"
+                    else:
+                        yield f"<{key}>{escape(str(elem))}</{key}>"
+            elif isinstance(value, dict):
+                if len(value.items()) == 0:
+                    continue
+
+                yield f"<{key}>"
+                yield from iter_xml(value)
+                yield f"</{key}>"
             else:
-                if isinstance(value, dict):
-                    if len(value.items()) == 0:
-                        continue
-
-                _internal += f"<{key}>"
-                _internal += to_xml(value)
-                _internal += f"</{key}>"
+                # Leaf values are emitted in one piece to avoid a generator
+                # frame per field
+                yield f"<{key}>{escape(str(value))}</{key}>"
     else:
-        _internal += escape(str(results))
-    return _internal
+        yield escape(str(results))
 
 
 def align(a: List[int], b: List[int]):
@@ -0,0 +1,42 @@
+import threading
+
+from resume_parsing import jobs
+
+
+def _claim_in_thread(store, lease, max_attempts=3):
+    claimed = []
+    thread = threading.Thread(
+        target=lambda: claimed.append(store.claim(lease, max_attempts))
+    )
+    thread.start()
+    thread.join()
+    return claimed[0]
+
+
+def test_outcome_of_expired_claim_is_dropped(tmp_path):
+    store = jobs.SQLiteJobStore(str(tmp_path / "jobs.db"))
+    job_id = store.submit("eA==", ".txt")
+    # The first worker's lease has run out by the time another one looks
+    first = store.claim(-1, 3)
+    second = _claim_in_thread(store, 600)
+    assert second.id == job_id and second.attempts == 2
+
+    assert not store.retry(first, 0)
+    assert not store.complete(first, "<stale/>")
+    assert not store.fail(first, 500, "stale")
+    assert store.get(job_id)["status"] == jobs.RUNNING
+
+    assert store.complete(second, "<fresh/>")
+    assert store.get(job_id) == {"id": job_id, "status": jobs.DONE, "xml": "<fresh/>"}
+
+
+def test_outcome_after_running_out_of_attempts_is_dropped(tmp_path):
+    store = jobs.SQLiteJobStore(str(tmp_path / "jobs.db"))
+    job_id = store.submit("eA==", ".txt")
+    last = store.claim(-1, 1)
+    assert _claim_in_thread(store, 600, max_attempts=1) is None
+
+    assert not store.complete(last, "<late/>")
+    job = store.get(job_id)
+    assert job["status"] == jobs.FAILED
+    assert "lease" in job["error"]["detail"]
@@ -0,0 +1,23 @@
+import threading
+
+from resume_parsing import metrics
+
+
+def test_peak_rss_of_overlapping_blocks():
+    sampler = metrics._RssSampler(interval=0.001)
+    sampler.start()
+    outer = sampler.track()
+    allocated = threading.Event()
+
+    def allocate():
+        inner = sampler.track()
+        buffer = bytearray(64 * 2**20)
+        allocated.set()
+        assert sampler.untrack(inner) >= len(buffer)
+
+    thread = threading.Thread(target=allocate)
+    thread.start()
+    thread.join()
+    assert allocated.is_set()
+    # The other block's end doesn't reset the peak of this one
+    assert sampler.untrack(outer) >= 64 * 2**20
@@ -0,0 +1,54 @@
+import base64
+import contextlib
+import threading
+import time
+
+from prometheus_client import REGISTRY
+
+from resume_parsing import admission, pipeline
+
+
+def _coalesced():
+    return REGISTRY.get_sample_value(
+        "resume_parsing_coalesced_calls_total", {"stage": "resume"}
+    )
+
+
+def test_duplicate_requests_are_admitted_once(monkeypatch):
+    admitted = []
+    started, release = threading.Event(), threading.Event()
+
+    @contextlib.contextmanager
+    def admit(content, file_extension):
+        admitted.append(content)
+        yield
+
+    def process_content(content, file_extension, request=None):
+        started.set()
+        release.wait(5)
+        return {"text": content.decode()}
+
+    monkeypatch.setattr(admission, "admit", admit)
+    monkeypatch.setattr(pipeline, "process_content", process_content)
+    file = base64.b64encode(b"duplicate resume").decode()
+    results = []
+
+    def request():
+        results.append(pipeline.process(file, ".txt"))
+
+    first = threading.Thread(target=request)
+    first.start()
+    started.wait(5)
+    retries = [threading.Thread(target=request) for _ in range(2)]
+    for retry in retries:
+        retry.start()
+    for _ in range(500):
+        if (_coalesced() or 0) >= 2:
+            break
+        time.sleep(0.01)
+    release.set()
+    for thread in [first, *retries]:
+        thread.join()
+
+    assert admitted == [b"duplicate resume"]
+    assert results == [{"text": "duplicate resume"}] * 3
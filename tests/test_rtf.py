@@ -0,0 +1,12 @@
+from resume_parsing import artifact_store, rtf
+
+
+def test_astral_character_is_one_code_point():
+    # U+1F600 as the UTF-16 surrogate pair \u-10179 \u-8704, with fallbacks
+    text = rtf.to_text(rb"{\rtf1\ansi\uc1 Hi \u-10179?\u-8704? there\par}")
+    assert text == "Hi \U0001f600 there\n"
+    artifact_store.digest(text)
+
+
+def test_lone_surrogate_is_replaced():
+    assert rtf.to_text(rb"{\rtf1\ansi\uc1 a\u-10179?b}") == "a\ufffdb"
@@ -0,0 +1,96 @@
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException, status
+from prometheus_client import REGISTRY
+
+from resume_parsing import deadline, singleflight
+
+
+def _coalesced(name):
+    return REGISTRY.get_sample_value(
+        "resume_parsing_coalesced_calls_total", {"stage": name}
+    )
+
+
+def _wait_for_followers(name, count):
+    # Followers count themselves just before they start waiting
+    for _ in range(500):
+        if (_coalesced(name) or 0) >= count:
+            return
+        time.sleep(0.01)
+    raise AssertionError(f"{count} followers never joined {name}")
+
+
+def _run_leader(group, key, fn):
+    outcome = {}
+
+    def lead():
+        try:
+            outcome["result"] = group.do(key, fn)
+        except HTTPException as err:
+            outcome["error"] = err
+
+    thread = threading.Thread(target=lead)
+    thread.start()
+    return thread, outcome
+
+
+def test_followers_rerun_after_leader_deadline():
+    group = singleflight.Group("test_leader_deadline")
+    started, release = threading.Event(), threading.Event()
+    runs = []
+
+    def leader_fn():
+        started.set()
+        release.wait(5)
+        raise HTTPException(status.HTTP_504_GATEWAY_TIMEOUT, "Deadline exceeded.")
+
+    def follower_fn():
+        runs.append(threading.current_thread().name)
+        return "parsed"
+
+    leader, outcome = _run_leader(group, "resume", leader_fn)
+    started.wait(5)
+    results = []
+    followers = [
+        threading.Thread(target=lambda: results.append(group.do("resume", follower_fn)))
+        for _ in range(3)
+    ]
+    for follower in followers:
+        follower.start()
+    _wait_for_followers(group.name, 3)
+    release.set()
+    leader.join()
+    for follower in followers:
+        follower.join()
+
+    assert outcome["error"].status_code == status.HTTP_504_GATEWAY_TIMEOUT
+    assert results == ["parsed"] * 3
+    # The first follower to retry ran the stage again, and the rest shared it
+    # unless they retried after it had finished
+    assert 1 <= len(runs) <= 3
+
+
+def test_follower_gives_up_at_its_own_deadline():
+    group = singleflight.Group("test_follower_deadline")
+    started, release = threading.Event(), threading.Event()
+
+    def leader_fn():
+        started.set()
+        release.wait(5)
+        return "parsed"
+
+    leader, outcome = _run_leader(group, "resume", leader_fn)
+    started.wait(5)
+    try:
+        with deadline.limit(0.05), pytest.raises(HTTPException) as err:
+            group.do("resume", lambda: "not run")
+        assert err.value.status_code == status.HTTP_504_GATEWAY_TIMEOUT
+        # The leader is unaffected by its follower giving up
+        assert leader.is_alive()
+    finally:
+        release.set()
+        leader.join()
+    assert outcome == {"result": "parsed"}